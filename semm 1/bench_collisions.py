@@ -0,0 +1,79 @@
+import argparse
+import time
+
+import numpy as np
+
+from simulation import ASTEROID_RADIUS, CELL_SIZE
+from spatial import SpatialGrid, colliding_pairs
+
+# Сравнение поиска пар сталкивающихся астероидов: сетка против перебора всех пар
+#   python bench_collisions.py
+#   python bench_collisions.py --counts 1000 10000 100000 --brute-limit 20000
+
+COUNTS = [1_000, 5_000, 20_000, 100_000]
+AREA = 1000  # астероиды разбросаны по квадрату AREA x AREA, как в окне
+DENSITY = 2e-4  # астероидов на квадратный пиксель при больших n: поле растёт вместе с n
+REPEATS = 3
+CHUNK = 2048
+
+
+def brute_force_pairs(x, y, distance):
+    # Все пары i < j блоками по CHUNK строк, чтобы матрица расстояний влезала в память
+    n = len(x)
+    first, second = [], []
+    for start in range(0, n, CHUNK):
+        rows = np.arange(start, min(start + CHUNK, n))
+        dx = x[rows, None] - x[None, :]
+        dy = y[rows, None] - y[None, :]
+        close = dx * dx + dy * dy < distance * distance
+        close &= rows[:, None] < np.arange(n)[None, :]
+        i, j = np.nonzero(close)
+        first.append(rows[i])
+        second.append(j)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def normalized(i, j):
+    return set(zip(np.minimum(i, j).tolist(), np.maximum(i, j).tolist()))
+
+
+def best_of(func, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def make_asteroids(count, seed=0):
+    rng = np.random.default_rng(seed)
+    side = max(AREA, (count / DENSITY) ** 0.5)
+    return rng.uniform(0, side, count), rng.uniform(0, side, count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Широкая фаза столкновений: сетка против перебора")
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--brute-limit", type=int, default=20_000, help="больше астероидов перебором не считаем")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args(argv)
+
+    distance = 2 * ASTEROID_RADIUS
+    print(f"{'астероидов':>10} {'пар':>8} {'сетка, мс':>10} {'перебор, мс':>12} {'ускорение':>10}")
+    for count in args.counts:
+        x, y = make_asteroids(count)
+        grid_time, (i, j) = best_of(lambda: colliding_pairs(x, y, distance, SpatialGrid(x, y, CELL_SIZE)),
+                                    args.repeats)
+        if count <= args.brute_limit:
+            brute_time, (bi, bj) = best_of(lambda: brute_force_pairs(x, y, distance), args.repeats)
+            assert normalized(i, j) == normalized(bi, bj), "сетка и перебор нашли разные пары"
+            brute = f"{brute_time * 1000:>12.2f} {brute_time / grid_time:>9.1f}x"
+        else:
+            brute = f"{'-':>12} {'-':>10}"
+        print(f"{count:>10} {len(i):>8} {grid_time * 1000:>10.2f} {brute}")
+
+
+if __name__ == "__main__":
+    main()
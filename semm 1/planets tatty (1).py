@@ -1,13 +1,24 @@
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSlider, QLabel, QSpinBox, QPushButton, \
     QMainWindow, QSpacerItem, QSizePolicy
-from PyQt6.QtGui import QPainter, QColor
-from PyQt6.QtCore import QTimer, QPoint, Qt
+from PyQt6.QtGui import QPainter, QColor, QPixmap, QRegion
+from PyQt6.QtCore import QTimer, QPoint, QPointF, QRect, Qt
+from PyQt6 import sip
 import sys
-import math
-import random
 import time
 import json
 
+import numpy as np
+
+from simulation import Simulation, FixedStepLoop, SUN_POSITION, SUN_RADIUS, PLANET_RADIUS, ASTEROID_RADIUS
+
+BACKGROUND_COLOR = QColor("#252525")
+SUN_COLOR = QColor(255, 255, 0, 150)
+ORBIT_COLOR = QColor(255, 255, 255, 25)
+ASTEROID_PEN = QColor(255, 255, 0)
+ASTEROID_BRUSH = QColor(200, 255, 255)
+DIRTY_RECTS_LIMIT = 256  # при большем числе тел дешевле перерисовать виджет целиком
+
+
 def get_styles_file(path):
     with open(path, 'r') as f:
         return f.read()
@@ -18,12 +29,16 @@ class Planets(QWidget):  #отвечает за отображение и обн
         super().__init__()
         self.initUI()
         self.paused = False
-        self.elapsed_time = 0
-        self.start_time = time.time()
-        self.initial_angles = [random.uniform(0, 360) for _ in range(8)]
-        self.asteroids = []  # список астероидов
-        self.planets_data = []
-        self.sun_radius = 60
+        self.simulation = Simulation(self.planets)  # физика отдельно от отрисовки
+        self.loop = FixedStepLoop(self.simulation)
+        # Цвета планет из эфемерид, QColor создаются один раз, а не на каждом кадре
+        self.planet_colors = [QColor(*color, 150) for color in self.simulation.ephemeris.colors]
+        self.last_tick = time.perf_counter()
+        self.snapshot = self.simulation.snapshot()
+        self.drawn_state = None  # (шаг, число астероидов) последнего нарисованного снимка
+        self.dirty_rects = None  # прямоугольники тел на экране, None - перерисовать всё
+        self.background = None  # фон, Солнце и орбиты, сбрасывается при изменении размера
+        self.asteroid_sprite = None
         self.clicked_point = None # точка клика для направления
 
     def initUI(self):
@@ -76,9 +91,98 @@ class Planets(QWidget):  #отвечает за отображение и обн
         self.timer.start(1000//60)
 
     def on_timer(self):
+        # Таймер только отмеряет реальное время, шаги симуляции фиксированной длины
+        now = time.perf_counter()
         if not self.paused:
-            self.elapsed_time += 0.1
-        self.update()
+            self.loop.advance(now - self.last_tick)
+        self.last_tick = now
+        state = (self.simulation.steps, len(self.simulation.asteroids))
+        if state == self.drawn_state:
+            return  # ничего не сдвинулось: перерисовывать нечего
+        self.drawn_state = state
+        self.snapshot = self.simulation.snapshot()
+
+        # Перерисовываются только места, где тела были и где они теперь
+        previous = self.dirty_rects
+        self.dirty_rects = self.body_rects(self.snapshot)
+        if previous is None or self.dirty_rects is None:
+            self.update()
+        else:
+            region = QRegion()
+            region.setRects(previous + self.dirty_rects)
+            self.update(region)
+
+    def body_rects(self, snapshot):
+        if len(snapshot.planets) + len(snapshot.asteroids) > DIRTY_RECTS_LIMIT:
+            return None
+        rects = []
+        for positions, radius in ((snapshot.planets, PLANET_RADIUS), (snapshot.asteroids, ASTEROID_RADIUS)):
+            size = 2 * radius + 4  # запас на перо и сглаживание
+            for x, y in np.floor(positions - radius - 2).astype(int).tolist():
+                rects.append(QRect(x, y, size, size))
+        return rects
+
+    def resizeEvent(self, event):
+        self.background = None
+        self.dirty_rects = None
+        super().resizeEvent(event)
+
+    def render_background(self):
+        # Неподвижный слой рисуется один раз в QPixmap, в кадре он только копируется
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(BACKGROUND_COLOR)
+        painter = QPainter(pixmap)
+        painter.setPen(QColor(0, 0, 0))
+        painter.setBrush(BACKGROUND_COLOR)
+        painter.drawRect(self.rect())
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(ORBIT_COLOR)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for radius in self.simulation.ephemeris.radius.tolist():
+            painter.drawEllipse(QPointF(*SUN_POSITION), radius, radius)
+
+        painter.setPen(SUN_COLOR)
+        painter.setBrush(SUN_COLOR)
+        painter.drawEllipse(QPoint(*SUN_POSITION), SUN_RADIUS, SUN_RADIUS)
+        painter.end()
+        return pixmap
+
+    def render_asteroid_sprite(self):
+        # Один сглаженный астероид; в кадре все астероиды - копии этой картинки
+        ratio = self.devicePixelRatioF()
+        size = 2 * ASTEROID_RADIUS + 2
+        pixmap = QPixmap(round(size * ratio), round(size * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(ASTEROID_PEN)
+        painter.setBrush(ASTEROID_BRUSH)
+        painter.drawEllipse(QPointF(size / 2, size / 2), ASTEROID_RADIUS, ASTEROID_RADIUS)
+        painter.end()
+        return pixmap
+
+    def draw_asteroids(self, painter, positions):
+        # Все астероиды одного цвета - один вызов drawPixmapFragments. Фрагмент - десять
+        # double (x, y, sourceLeft, sourceTop, width, height, scaleX, scaleY, rotation,
+        # opacity), поэтому массив фрагментов заполняется из NumPy без цикла Python
+        count = len(positions)
+        if not count:
+            return
+        sprite = self.asteroid_sprite
+        fragments = sip.array(QPainter.PixmapFragment, count)
+        fields = np.frombuffer(memoryview(fragments), dtype=np.float64).reshape(count, 10)
+        fields[:, 0:2] = positions
+        fields[:, 2:4] = 0
+        fields[:, 4] = sprite.width()
+        fields[:, 5] = sprite.height()
+        fields[:, 6:8] = 1 / sprite.devicePixelRatio()  # источник в пикселях картинки, цель - в логических
+        fields[:, 8] = 0
+        fields[:, 9] = 1
+        painter.drawPixmapFragments(fragments, sprite)
 
     def on_pause_clicked(self):
         self.paused = not self.paused
@@ -94,72 +198,31 @@ class Planets(QWidget):  #отвечает за отображение и обн
                          release_point.y() - self.clicked_point.y())
             speed = self.slider.value()
             mass = self.mass_spinbox.value()
-            self.asteroids.append({
-                "position": [self.clicked_point.x(), self.clicked_point.y()],
-                "direction": direction,
-                "speed": speed,
-                "mass": mass
-            })
+            self.simulation.add_asteroid((self.clicked_point.x(), self.clicked_point.y()),
+                                         direction, speed, mass)
             self.clicked_point = None
 
-    def paintEvent(self, event):  #метод вызывается Qt каждый раз, когда нужно перерисовать виджет. Здесь происходит вся отрисовка элементов симуляции.
+    def paintEvent(self, event):  #метод вызывается Qt каждый раз, когда нужно перерисовать виджет. Здесь только отрисовка снимка симуляции.
+        ratio = self.devicePixelRatioF()
+        if self.background is None or self.background.devicePixelRatio() != ratio:
+            self.background = self.render_background()
+        if self.asteroid_sprite is None or self.asteroid_sprite.devicePixelRatio() != ratio:
+            self.asteroid_sprite = self.render_asteroid_sprite()
 
+        # Qt ограничивает рисование областью event.region(), остальное на экране не трогается
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setPen(QColor(0, 0, 0))
-        painter.setBrush(QColor("#252525"))
-        painter.drawRect(self.rect())
-
-        # Рисуем Солнце
-        sun_position = [500, 400]
-        sun_radius = 75
-        painter.setPen(QColor(255, 255, 0, 150))
-        painter.setBrush(QColor(255, 255, 0, 150))
-        painter.drawEllipse(QPoint(*sun_position), sun_radius, sun_radius)
-
-        # Рисуем планеты
-        r = 70
-        planets = []
-
-        for planet in self.planets:
-            painter.setPen(QColor(*planet["color"], 150))
-            painter.setBrush(QColor(*planet["color"], 150))
-            angle = (self.elapsed_time * planet["speed"]) + self.initial_angles[self.planets.index(planet)]
-            x = 500 + r * math.cos(math.radians(angle))
-            y = 400 + r * math.sin(math.radians(angle))
-            planets.append({"position": [x, y], "radius": 20})
-            painter.drawEllipse(QPoint(int(x), int(y)), 20, 20)
-            r += 20
+        painter.drawPixmap(0, 0, self.background)
 
+        # Рисуем планеты: их немного, сглаживание только для них
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for (x, y), color in zip(self.snapshot.planets.tolist(), self.planet_colors):
+            painter.setPen(color)
+            painter.setBrush(color)
+            painter.drawEllipse(QPoint(int(x), int(y)), PLANET_RADIUS, PLANET_RADIUS)
 
         # Рисуем астероиды
-        for asteroid in self.asteroids:
-            x, y = asteroid["position"]
-            painter.setPen(QColor(255, 255, 0))
-            painter.setBrush(QColor(200, 255, 255))
-            painter.drawEllipse(QPoint(int(x), int(y)), 10, 10)
-
-            # Обновляем позицию
-            direction_x, direction_y = asteroid["direction"]
-            asteroid["position"][0] += direction_x * asteroid["speed"] * 0.01
-            asteroid["position"][1] += direction_y * asteroid["speed"] * 0.01
-
-            # Проверка столкновения с солнцем
-            if math.hypot(x - sun_position[0], y - sun_position[1]) < sun_radius:
-                sun_radius += asteroid["mass"] * 1000 * asteroid["mass"]
-                self.asteroids.remove(asteroid)
-                continue
-
-            # Проверка столкновения с планетами
-            for planet in planets[:]:
-                px, py = planet["position"]
-                расстояние = math.hypot(x - px, y - py)
-                if расстояние < planet["radius"]:
-                    увеличение_радиуса = asteroid[
-                                             "mass"] * 500  # Настройте коэффициент масштабирования по необходимости
-                    planet["radius"] = min(planet["radius"] + увеличение_радиуса, 200)  # Ограничиваем радиус до 200
-                    self.asteroids.remove(asteroid)
-                    break
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        self.draw_asteroids(painter, self.snapshot.asteroids)
 
 
 class MainWindow(QMainWindow):
@@ -0,0 +1,263 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from spatial import SpatialGrid, colliding_pairs, connected_groups
+
+
+# Физика симуляции без Qt: шаг фиксированной длины, виджет только рисует снимки.
+# Скорости подобраны так, чтобы при 60 шагах в секунду всё двигалось как раньше,
+# когда планеты и астероиды сдвигались в paintEvent на каждом кадре таймера
+FIXED_DT = 1 / 60  # секунд на шаг
+MAX_STEPS_PER_FRAME = 10  # больше шагов за кадр не делаем, чтобы не уйти в догонялки
+
+SUN_POSITION = (500, 400)
+SUN_RADIUS = 75
+FIRST_ORBIT = 70
+ORBIT_STEP = 20
+PLANET_RADIUS = 20
+ASTEROID_RADIUS = 10
+CELL_SIZE = 2 * ASTEROID_RADIUS  # клетка сетки не меньше расстояния столкновения двух астероидов
+
+TIME_RATE = 6.0  # единиц времени орбит в секунду (было +0.1 за кадр)
+ASTEROID_RATE = 0.6  # смещение = направление * скорость * ASTEROID_RATE в секунду (было * 0.01 за кадр)
+
+
+class Snapshot:
+    # Состояние для отрисовки: виджет читает только его
+    def __init__(self, time, planets, asteroids):
+        self.time = time
+        self.planets = planets  # массив (k, 2) с центрами планет, порядок как в Ephemeris
+        self.asteroids = asteroids  # массив (n, 2) с координатами, копия
+
+
+class Ephemeris:
+    # Орбиты планет, посчитанные один раз: радиус, угловая скорость и начальная фаза
+    # лежат в массивах, положения всех планет на момент t - один векторный вызов.
+    # Последний результат запоминается: шаг и снимок на одном времени его разделяют
+    def __init__(self, planets, initial_angles):
+        count = len(planets)
+        self.radius = FIRST_ORBIT + ORBIT_STEP * np.arange(count, dtype=float)
+        self.angular_speed = np.radians([planet["speed"] for planet in planets])
+        self.phase = np.radians(np.asarray(initial_angles, dtype=float))
+        self.colors = [tuple(planet["color"]) for planet in planets]
+        self.cached_time = None
+        self.cached = None
+
+    def __len__(self):
+        return len(self.radius)
+
+    def positions(self, t):
+        # Массив (k, 2) только для чтения: его держат и снимки, и проверка столкновений
+        if t != self.cached_time:
+            angle = self.angular_speed * t + self.phase
+            positions = np.empty((len(self.radius), 2))
+            positions[:, 0] = SUN_POSITION[0] + self.radius * np.cos(angle)
+            positions[:, 1] = SUN_POSITION[1] + self.radius * np.sin(angle)
+            positions.flags.writeable = False
+            self.cached_time = t
+            self.cached = positions
+        return self.cached
+
+
+class AsteroidStore:
+    # Астероиды как структура массивов: координаты, скорости и массы лежат
+    # в отдельных массивах NumPy, шаг и проверки столкновений идут сразу по всем.
+    # Удаление - сжатие булевой маской, без list.remove в цикле
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+        self.vx = np.empty(capacity)
+        self.vy = np.empty(capacity)
+        self.mass = np.empty(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, size):
+        capacity = len(self.x)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("x", "y", "vx", "vy", "mass"):
+            array = np.empty(capacity)
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+    def add(self, x, y, vx, vy, mass):
+        self.add_many([x], [y], [vx], [vy], [mass])
+
+    def add_many(self, x, y, vx, vy, mass):
+        start = self.count
+        end = start + len(x)
+        self.reserve(end)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = vx
+        self.vy[start:end] = vy
+        self.mass[start:end] = mass
+        self.count = end
+
+    def integrate(self, dt):
+        n = self.count
+        self.x[:n] += self.vx[:n] * dt
+        self.y[:n] += self.vy[:n] * dt
+
+    def compact(self, keep):
+        # keep - маска длины count: оставшиеся астероиды сдвигаются в начало массивов
+        n = self.count
+        kept = int(np.count_nonzero(keep))
+        for array in (self.x, self.y, self.vx, self.vy, self.mass):
+            array[:kept] = array[:n][keep]
+        self.count = kept
+
+    def positions(self):
+        return np.column_stack((self.x[:self.count], self.y[:self.count]))
+
+
+class Simulation:
+    def __init__(self, planets, initial_angles=None, seed=None, asteroid_collisions=True):
+        self.planets = planets
+        self.asteroid_collisions = asteroid_collisions
+        if initial_angles is None:
+            rnd = random.Random(seed)
+            initial_angles = [rnd.uniform(0, 360) for _ in planets]
+        self.initial_angles = initial_angles
+        self.ephemeris = Ephemeris(planets, initial_angles)
+        self.time = 0.0
+        self.steps = 0
+        self.asteroids = AsteroidStore()
+
+    def add_asteroid(self, position, direction, speed, mass):
+        # Скорость считается один раз при создании, а не на каждом шаге
+        rate = speed * ASTEROID_RATE
+        self.asteroids.add(position[0], position[1], direction[0] * rate, direction[1] * rate, mass)
+
+    def planet_positions(self):
+        return self.ephemeris.positions(self.time)
+
+    def step(self, dt):
+        self.time += dt * TIME_RATE
+        self.steps += 1
+        asteroids = self.asteroids
+        if not asteroids.count:
+            return
+        asteroids.integrate(dt)
+
+        # Сетка строится заново на каждом шаге; точная проверка расстояний
+        # идёт только для астероидов из клеток рядом с телом или соседом
+        n = asteroids.count
+        x = asteroids.x[:n]
+        y = asteroids.y[:n]
+        grid = SpatialGrid(x, y, CELL_SIZE)
+
+        # Столкновение с солнцем или планетой: астероид поглощается.
+        # Прирост радиуса в старом paintEvent терялся на следующем кадре, размеры не меняются
+        hit = np.zeros(n, dtype=bool)
+        bodies = [(SUN_POSITION[0], SUN_POSITION[1], SUN_RADIUS)]
+        bodies += [(px, py, PLANET_RADIUS) for px, py in self.planet_positions().tolist()]
+        for cx, cy, radius in bodies:
+            candidates = grid.query_circle(cx, cy, radius)
+            dx = x[candidates] - cx
+            dy = y[candidates] - cy
+            hit[candidates[dx * dx + dy * dy < radius * radius]] = True
+
+        keep = ~hit
+        if self.asteroid_collisions:
+            keep &= self.merge_asteroids(grid, hit)
+        if not keep.all():
+            asteroids.compact(keep)
+
+    def merge_asteroids(self, grid, hit):
+        # Соприкоснувшиеся астероиды сливаются в один: масса складывается, положение -
+        # центр масс, скорость - из сохранения импульса. Цепочки касаний сливаются целиком.
+        # Возвращает маску уцелевших: в каждой группе остаётся астероид с меньшим индексом
+        asteroids = self.asteroids
+        n = asteroids.count
+        x = asteroids.x[:n]
+        y = asteroids.y[:n]
+        i, j = colliding_pairs(x, y, 2 * ASTEROID_RADIUS, grid)
+        alive = ~(hit[i] | hit[j])
+        i, j = i[alive], j[alive]
+        if not len(i):
+            return np.ones(n, dtype=bool)
+
+        labels = connected_groups(n, i, j)
+        mass = asteroids.mass[:n]
+        total = np.bincount(labels, mass, n)
+        survivors = labels == np.arange(n)
+        merged = survivors & (total > mass)
+        for array in (x, y, asteroids.vx[:n], asteroids.vy[:n]):
+            weighted = np.bincount(labels, array * mass, n)
+            array[merged] = weighted[merged] / total[merged]
+        mass[merged] = total[merged]
+        return survivors
+
+    def snapshot(self):
+        return Snapshot(self.time, self.planet_positions(), self.asteroids.positions())
+
+
+class FixedStepLoop:
+    # Накопитель реального времени: симуляция делает столько шагов dt, сколько
+    # времени прошло, поэтому её ход не зависит от частоты и пропусков кадров
+    def __init__(self, simulation, dt=FIXED_DT, max_steps=MAX_STEPS_PER_FRAME):
+        self.simulation = simulation
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.dt:
+            if steps == self.max_steps:
+                # Не успеваем: отставание отбрасываем, симуляция замедляется, но не зависает
+                self.accumulator = 0.0
+                break
+            self.simulation.step(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+        return steps
+
+
+def run_headless(simulation, steps, dt=FIXED_DT):
+    for _ in range(steps):
+        simulation.step(dt)
+    return simulation
+
+
+def main(argv=None):
+    # Пакетный прогон без GUI: python simulation.py --steps 10000 --asteroids 1000
+    parser = argparse.ArgumentParser(description="Симуляция без окна")
+    parser.add_argument("--planets", default="planets (1) (1).json")
+    parser.add_argument("--steps", type=int, default=10_000)
+    parser.add_argument("--asteroids", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-merge", action="store_true", help="астероиды не сливаются друг с другом")
+    args = parser.parse_args(argv)
+
+    with open(args.planets, 'r') as f:
+        planets = json.load(f)
+
+    simulation = Simulation(planets, seed=args.seed, asteroid_collisions=not args.no_merge)
+    rng = np.random.default_rng(args.seed)
+    n = args.asteroids
+    rate = rng.integers(1, 51, n) * ASTEROID_RATE
+    simulation.asteroids.add_many(rng.uniform(0, 1000, n), rng.uniform(0, 1000, n),
+                                  rng.uniform(-100, 100, n) * rate, rng.uniform(-100, 100, n) * rate,
+                                  rng.integers(1, 10001, n))
+
+    start = time.perf_counter()
+    run_headless(simulation, args.steps)
+    elapsed = time.perf_counter() - start
+    print(f"{args.steps} шагов за {elapsed:.2f} с ({args.steps / elapsed:.0f} шагов/с), "
+          f"осталось астероидов: {len(simulation.asteroids)}")
+
+
+if __name__ == "__main__":
+    main()
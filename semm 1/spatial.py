@@ -0,0 +1,110 @@
+import numpy as np
+
+
+# Широкая фаза столкновений: равномерная сетка, которая строится заново на
+# каждом шаге. Точки сортируются по номеру клетки, поэтому содержимое любой
+# клетки - непрерывный отрезок, а соседние клетки находятся searchsorted.
+# Кандидатов в пары получается порядка n, а не n^2 при переборе всех со всеми
+
+# Соседние клетки "вперёд": каждая пара клеток просматривается один раз
+FORWARD_NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class SpatialGrid:
+    def __init__(self, x, y, cell_size):
+        self.cell_size = cell_size
+        self.count = len(x)
+        if not self.count:
+            return
+        ix = np.floor(x / cell_size).astype(np.int64)
+        iy = np.floor(y / cell_size).astype(np.int64)
+        # Номера клеток сдвигаются так, чтобы у крайних оставался пустой сосед
+        self.ix0 = ix.min() - 1
+        self.iy0 = iy.min() - 1
+        self.columns = int(ix.max() - self.ix0) + 2
+        self.rows = int(iy.max() - self.iy0) + 2
+        keys = (ix - self.ix0) * self.rows + (iy - self.iy0)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def query_circle(self, cx, cy, radius):
+        # Индексы точек из клеток, покрывающих круг; точная проверка - у вызывающего
+        if not self.count:
+            return np.empty(0, dtype=np.int64)
+        size = self.cell_size
+        column_from = max(int(np.floor((cx - radius) / size)) - self.ix0, 0)
+        column_to = min(int(np.floor((cx + radius) / size)) - self.ix0, self.columns - 1)
+        row_from = max(int(np.floor((cy - radius) / size)) - self.iy0, 0)
+        row_to = min(int(np.floor((cy + radius) / size)) - self.iy0, self.rows - 1)
+        if column_from > column_to or row_from > row_to:
+            return np.empty(0, dtype=np.int64)
+
+        # В каждом столбце нужные клетки идут подряд: один отрезок на столбец
+        columns = np.arange(column_from, column_to + 1) * self.rows
+        starts = np.searchsorted(self.keys, columns + row_from, 'left')
+        ends = np.searchsorted(self.keys, columns + row_to, 'right')
+        return self.order[expand_ranges(starts, ends)]
+
+    def candidate_pairs(self):
+        # Пары (i, j) из одной или соседних клеток, каждая пара один раз
+        if not self.count:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        keys = self.keys
+        positions = np.arange(self.count)
+
+        # Своя клетка: точки после текущей в том же отрезке
+        starts = positions + 1
+        ends = np.searchsorted(keys, keys, 'right')
+        first = [np.repeat(positions, ends - starts)]
+        second = [expand_ranges(starts, ends)]
+
+        for dx, dy in FORWARD_NEIGHBOURS:
+            target = keys + dx * self.rows + dy
+            starts = np.searchsorted(keys, target, 'left')
+            ends = np.searchsorted(keys, target, 'right')
+            first.append(np.repeat(positions, ends - starts))
+            second.append(expand_ranges(starts, ends))
+
+        return self.order[np.concatenate(first)], self.order[np.concatenate(second)]
+
+
+def expand_ranges(starts, ends):
+    # Склеивает отрезки [starts[k], ends[k]) в один массив индексов без цикла Python
+    counts = np.maximum(ends - starts, 0)
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+def colliding_pairs(x, y, distance, grid):
+    # Узкая фаза: из кандидатов остаются пары ближе distance
+    i, j = grid.candidate_pairs()
+    dx = x[i] - x[j]
+    dy = y[i] - y[j]
+    close = dx * dx + dy * dy < distance * distance
+    return i[close], j[close]
+
+
+def connected_groups(count, i, j):
+    # Метка группы для каждой точки: минимальный индекс в связной компоненте
+    # графа пар. Корень большей метки подвешивается к меньшей, затем метки
+    # сжимаются до корней; уже объединённые пары отбрасываются на каждом круге
+    labels = np.arange(count)
+    while len(i):
+        low = np.minimum(labels[i], labels[j])
+        high = np.maximum(labels[i], labels[j])
+        apart = low != high
+        if not apart.any():
+            break
+        low, high = low[apart], high[apart]
+        i, j = i[apart], j[apart]
+        np.minimum.at(labels, high, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
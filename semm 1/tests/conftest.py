@@ -0,0 +1,15 @@
+import json
+import pathlib
+import sys
+
+import pytest
+
+# Модули симуляции лежат в каталоге "semm 1" и импортируют друг друга напрямую
+SIMULATION_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SIMULATION_DIR))
+
+
+@pytest.fixture(scope="session")
+def planets():
+    with open(SIMULATION_DIR / "planets (1) (1).json", 'r') as f:
+        return json.load(f)
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+from simulation import (AsteroidStore, Simulation, ASTEROID_RATE, FIXED_DT, PLANET_RADIUS, SUN_POSITION,
+                        SUN_RADIUS)
+
+
+def test_growth_keeps_data():
+    store = AsteroidStore(capacity=2)
+    for k in range(5):
+        store.add(k, -k, 2 * k, 0, 10 + k)
+    store.add_many(np.arange(5, 100), -np.arange(5, 100), 2 * np.arange(5, 100), np.zeros(95), 10 + np.arange(5, 100))
+    assert len(store) == 100 and len(store.x) == 128
+    assert store.positions().tolist() == [[k, -k] for k in range(100)]
+    assert store.mass[:100].tolist() == list(range(10, 110))
+
+
+def test_integrate_and_compact():
+    store = AsteroidStore()
+    store.add_many([0, 10, 20], [0, 0, 0], [1, 2, 3], [-1, 0, 1], [5, 6, 7])
+    store.integrate(0.5)
+    assert store.positions().tolist() == [[0.5, -0.5], [11, 0], [21.5, 0.5]]
+    store.compact(np.array([True, False, True]))
+    assert len(store) == 2
+    assert store.positions().tolist() == [[0.5, -0.5], [21.5, 0.5]]
+    assert store.vx[:2].tolist() == [1, 3] and store.mass[:2].tolist() == [5, 7]
+
+
+def reference_step(asteroids, planet_positions, dt):
+    # Прежний paintEvent: цикл Python, math.hypot с солнцем и каждой планетой
+    survivors = []
+    for x, y, vx, vy in asteroids:
+        x, y = x + vx * dt, y + vy * dt
+        bodies = [(SUN_POSITION, SUN_RADIUS)] + [(position, PLANET_RADIUS) for position in planet_positions]
+        if all(math.hypot(x - bx, y - by) >= radius for (bx, by), radius in bodies):
+            survivors.append((x, y, vx, vy))
+    return survivors
+
+
+def test_vectorized_step_matches_loop(planets):
+    simulation = Simulation(planets, seed=22, asteroid_collisions=False)
+    rng = np.random.default_rng(22)
+    count = 5000
+    for _ in range(count // 100):
+        simulation.add_asteroid(rng.uniform(0, 1000, 2), rng.uniform(-50, 50, 2), int(rng.integers(1, 51)), 1)
+    simulation.asteroids.add_many(rng.uniform(200, 800, count), rng.uniform(100, 700, count),
+                                  rng.uniform(-300, 300, count), rng.uniform(-300, 300, count), np.ones(count))
+    store = simulation.asteroids
+    expected = list(zip(store.x[:len(store)], store.y[:len(store)], store.vx[:len(store)], store.vy[:len(store)]))
+
+    for _ in range(30):
+        simulation.step(FIXED_DT)
+        expected = reference_step(expected, simulation.planet_positions().tolist(), FIXED_DT)
+        assert np.allclose(store.positions(), [(x, y) for x, y, _, _ in expected])
+    assert 0 < len(store) < count
+
+
+def test_add_asteroid_scales_speed(planets):
+    simulation = Simulation(planets, seed=0)
+    simulation.add_asteroid((900, 900), (3, -4), 10, 50)
+    store = simulation.asteroids
+    assert (store.vx[0], store.vy[0]) == (3 * 10 * ASTEROID_RATE, -4 * 10 * ASTEROID_RATE)
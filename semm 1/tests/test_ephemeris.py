@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+from simulation import Ephemeris, Simulation, FIRST_ORBIT, ORBIT_STEP, SUN_POSITION, FIXED_DT
+
+
+def direct_positions(planets, angles, t):
+    # Прежний расчёт в paintEvent: cos/sin для каждой планеты отдельно
+    positions = []
+    for index, (planet, angle) in enumerate(zip(planets, angles)):
+        radius = FIRST_ORBIT + ORBIT_STEP * index
+        current = math.radians(angle + planet["speed"] * t)
+        positions.append((SUN_POSITION[0] + radius * math.cos(current),
+                          SUN_POSITION[1] + radius * math.sin(current)))
+    return positions
+
+
+@pytest.mark.parametrize("t", [0.0, 0.1, 17.3, 1e4])
+def test_positions_match_direct_trig(planets, t):
+    angles = [index * 37.5 for index in range(len(planets))]
+    ephemeris = Ephemeris(planets, angles)
+    assert len(ephemeris) == len(planets)
+    assert np.allclose(ephemeris.positions(t), direct_positions(planets, angles, t))
+
+
+def test_positions_are_cached_and_read_only(planets):
+    ephemeris = Ephemeris(planets, [0] * len(planets))
+    first = ephemeris.positions(5.0)
+    assert ephemeris.positions(5.0) is first
+    with pytest.raises(ValueError):
+        first[0, 0] = 0
+    assert ephemeris.positions(6.0) is not first
+
+
+def test_step_and_snapshot_share_positions(planets):
+    simulation = Simulation(planets, seed=24)
+    simulation.step(FIXED_DT)
+    assert simulation.snapshot().planets is simulation.planet_positions()
+    assert simulation.ephemeris.colors[0] == tuple(planets[0]["color"])
@@ -0,0 +1,51 @@
+import numpy as np
+
+from simulation import FixedStepLoop, Simulation, FIXED_DT, MAX_STEPS_PER_FRAME, run_headless
+
+
+def seeded(planets, count=300):
+    simulation = Simulation(planets, seed=21)
+    rng = np.random.default_rng(21)
+    simulation.asteroids.add_many(rng.uniform(0, 1000, count), rng.uniform(0, 1000, count),
+                                  rng.uniform(-60, 60, count), rng.uniform(-60, 60, count),
+                                  rng.integers(1, 10001, count))
+    return simulation
+
+
+def state(simulation):
+    snapshot = simulation.snapshot()
+    return simulation.steps, snapshot.time, snapshot.planets.tolist(), snapshot.asteroids.tolist()
+
+
+def test_result_does_not_depend_on_frame_rate(planets):
+    # Одна секунда реального времени кадрами 60 Гц, 144 Гц и с пропусками кадров (до MAX_STEPS_PER_FRAME шагов)
+    results = []
+    for frames in ([1 / 60] * 60, [1 / 144] * 144, [0.05, 0.1, 0.0, 0.15, 0.15, 0.15, 0.15, 0.15, 0.1]):
+        simulation = seeded(planets)
+        loop = FixedStepLoop(simulation)
+        for elapsed in frames:
+            loop.advance(elapsed)
+        loop.advance(1e-9)  # остаток накопителя от округления сумм
+        results.append(state(simulation))
+    assert results[0][0] == 60
+    assert results[1:] == results[:1] * 2
+
+
+def test_same_seed_same_run(planets):
+    assert state(run_headless(seeded(planets), 200)) == state(run_headless(seeded(planets), 200))
+
+
+def test_slow_frame_drops_the_backlog(planets):
+    simulation = seeded(planets, count=0)
+    loop = FixedStepLoop(simulation)
+    assert loop.advance(5.0) == MAX_STEPS_PER_FRAME
+    assert loop.accumulator == 0.0
+    assert loop.advance(FIXED_DT / 2) == 0
+
+
+def test_snapshot_is_a_copy(planets):
+    simulation = seeded(planets)
+    snapshot = simulation.snapshot()
+    before = snapshot.asteroids.copy()
+    simulation.step(FIXED_DT)
+    assert np.array_equal(snapshot.asteroids, before)
@@ -0,0 +1,96 @@
+import importlib.util
+import json
+import os
+import pathlib
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+from PyQt6.QtCore import QSize  # noqa: E402
+
+from simulation import ASTEROID_RADIUS, SUN_POSITION  # noqa: E402
+
+WINDOW = pathlib.Path(__file__).resolve().parent.parent / "planets tatty (1).py"
+
+
+@pytest.fixture(scope="module")
+def window_module():
+    application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    spec = importlib.util.spec_from_file_location("planets_window", WINDOW)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module  # QApplication должен жить, пока тесты создают виджеты
+    del application
+
+
+@pytest.fixture
+def widget(window_module, planets, tmp_path, monkeypatch):
+    # Виджет читает planetts.json из текущего каталога
+    (tmp_path / "planetts.json").write_text(json.dumps(planets))
+    monkeypatch.chdir(tmp_path)
+    widget = window_module.Planets()
+    widget.timer.stop()
+    widget.resize(1000, 1000)
+    # Скрытый виджет получает событие изменения размера на каждом grab()
+    widget.show()
+    QtWidgets.QApplication.processEvents()
+    yield widget
+    widget.close()
+
+
+def pixel(image, x, y):
+    color = image.pixelColor(x, y)
+    return color.red(), color.green(), color.blue()
+
+
+def test_frame_draws_background_sun_and_asteroids(widget, window_module):
+    positions = [(700, 150), (850, 900), (950, 500)]
+    for x, y in positions:
+        widget.simulation.add_asteroid((x, y), (0, 0), 1, 1)
+    widget.snapshot = widget.simulation.snapshot()
+    image = widget.grab().toImage()
+
+    background = window_module.BACKGROUND_COLOR
+    assert pixel(image, 990, 10) == (background.red(), background.green(), background.blue())
+    red, green, blue = pixel(image, *SUN_POSITION)
+    assert red > 100 and green > 100 and blue < 50
+    brush = window_module.ASTEROID_BRUSH
+    for x, y in positions:
+        assert pixel(image, x, y) == (brush.red(), brush.green(), brush.blue())
+        assert pixel(image, x + ASTEROID_RADIUS + 3, y) == pixel(image, 990, 10)
+
+
+def test_static_layer_is_cached_until_resize(widget):
+    widget.grab()
+    background = widget.background
+    assert background is not None and background.size() == QSize(1000, 1000) * widget.devicePixelRatioF()
+    widget.grab()
+    assert widget.background is background
+    widget.resize(800, 600)
+    QtWidgets.QApplication.processEvents()
+    widget.grab()
+    assert widget.background is not background
+    assert widget.background.size() == QSize(800, 600) * widget.devicePixelRatioF()
+
+
+def test_dirty_rects(widget, window_module):
+    widget.simulation.add_asteroid((300, 300), (0, 0), 1, 1)
+    rects = widget.body_rects(widget.simulation.snapshot())
+    assert len(rects) == len(widget.planets) + 1
+    assert rects[-1].contains(300 - ASTEROID_RADIUS, 300 + ASTEROID_RADIUS)
+
+    count = window_module.DIRTY_RECTS_LIMIT
+    rng = np.random.default_rng(25)
+    widget.simulation.asteroids.add_many(rng.uniform(0, 1000, count), rng.uniform(0, 1000, count),
+                                         np.zeros(count), np.zeros(count), np.ones(count))
+    assert widget.body_rects(widget.simulation.snapshot()) is None
+
+
+def test_paused_timer_skips_repaint(widget):
+    widget.paused = True
+    widget.on_timer()
+    snapshot = widget.snapshot
+    widget.on_timer()
+    assert widget.snapshot is snapshot
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from bench_collisions import brute_force_pairs, normalized
+from simulation import Simulation, ASTEROID_RADIUS, CELL_SIZE, FIXED_DT
+from spatial import SpatialGrid, colliding_pairs, connected_groups
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_pairs_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    count = 3000
+    side = rng.choice([200, 1000, 4000])
+    x, y = rng.uniform(-side / 2, side / 2, count), rng.uniform(0, side, count)
+    x[:50] = x[0]  # стопка в одной клетке
+    i, j = colliding_pairs(x, y, 2 * ASTEROID_RADIUS, SpatialGrid(x, y, CELL_SIZE))
+    assert len(normalized(i, j)) == len(i)  # каждая пара один раз
+    assert normalized(i, j) == normalized(*brute_force_pairs(x, y, 2 * ASTEROID_RADIUS))
+
+
+def test_query_circle_covers_the_circle():
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 1000, 5000), rng.uniform(0, 1000, 5000)
+    grid = SpatialGrid(x, y, CELL_SIZE)
+    for cx, cy, radius in ((500, 400, 75), (0, 0, 20), (990, 10, 20), (-500, -500, 30)):
+        candidates = grid.query_circle(cx, cy, radius)
+        inside = np.flatnonzero((x - cx) ** 2 + (y - cy) ** 2 < radius ** 2)
+        assert set(inside.tolist()) <= set(candidates.tolist())
+        assert len(set(candidates.tolist())) == len(candidates)
+
+
+def test_empty_grid():
+    empty = np.empty(0)
+    grid = SpatialGrid(empty, empty, CELL_SIZE)
+    assert len(grid.query_circle(0, 0, 100)) == 0
+    assert all(len(side) == 0 for side in grid.candidate_pairs())
+
+
+def union_find_labels(count, pairs):
+    parent = list(range(count))
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        parent[max(ra, rb)] = min(ra, rb)
+    roots = [find(a) for a in range(count)]
+    smallest = {}
+    for a, root in enumerate(roots):
+        smallest.setdefault(root, a)
+    return [smallest[root] for root in roots]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_connected_groups_match_union_find(seed):
+    rng = np.random.default_rng(seed)
+    count = 500
+    i, j = rng.integers(0, count, 400), rng.integers(0, count, 400)
+    assert connected_groups(count, i, j).tolist() == union_find_labels(count, zip(i.tolist(), j.tolist()))
+
+
+def test_merge_conserves_mass_and_momentum(planets):
+    simulation = Simulation(planets, seed=0)
+    rng = np.random.default_rng(23)
+    count = 2000
+    # Поле вдали от солнца и планет: астероиды пропадают только при слиянии
+    simulation.asteroids.add_many(rng.uniform(2000, 2600, count), rng.uniform(2000, 2600, count),
+                                  rng.uniform(-30, 30, count), rng.uniform(-30, 30, count),
+                                  rng.integers(1, 10001, count))
+
+    def totals():
+        store = simulation.asteroids
+        mass = store.mass[:len(store)]
+        return np.array([mass.sum()] + [(mass * array[:len(store)]).sum()
+                                        for array in (store.vx, store.vy, store.x, store.y)])
+
+    mass, px, py, mx, my = totals()
+    simulation.step(FIXED_DT)
+    assert len(simulation.asteroids) < count
+    # Масса и импульс сохраняются, центр масс сдвигается на импульс * dt
+    assert np.allclose(totals(), [mass, px, py, mx + px * FIXED_DT, my + py * FIXED_DT])
+
+
+def test_chain_merges_into_one(planets):
+    simulation = Simulation(planets, seed=0)
+    step = 2 * ASTEROID_RADIUS * 0.9
+    simulation.asteroids.add_many([3000 + k * step for k in range(5)], [3000] * 5, [0] * 5, [0] * 5, [1, 2, 3, 4, 10])
+    simulation.step(FIXED_DT)
+    store = simulation.asteroids
+    assert len(store) == 1
+    assert store.mass[0] == 20
+    assert np.isclose(store.x[0], 3000 + step * (0 + 2 + 6 + 12 + 40) / 20)
@@ -1,90 +1,83 @@
+import argparse
 import base64
-from collections import Counter
+import codecs
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import ast                         # Позволяет безопасно оценивать строки, кот-ые содержат Python выражения
+import getpass
+import mmap
+import os
 import re
-
-class HuffmanNode:                   #Класс для представления узлов дерева Хаффмана
-     def __init__(self, char, freq):
-        self.char = char  # Символ
-        self.freq = freq  # Частота встречаемости символа
-        self.left = None  # Ссылка на левого потомка
-        self.right = None  # Ссылка на правого потомка
-
-     def __lt__(self, other):      #Метод сравнения для сортировки узлов по частоте
-        return self.freq < other.freq
+import shutil
+import sys
+import tempfile
+
+try:
+    from app.huffman import (build_tree, generate_codes, generate_code_lengths, limited_code_lengths,
+                             canonical_code_table, table_to_codebook, build_code_table,
+                             group_code_lengths, ungroup_code_lengths, BitWriter, DecodeTables,
+                             TableDecoder, encode_bytes, xor_bytes, byte_code_table,
+                             BYTE_ENCODING, MAX_CODE_LENGTH)
+    from app.frequency import Histogram, byte_frequency
+    from app import wire
+except ImportError:  # запуск как скрипта из каталога приложения
+    from huffman import (build_tree, generate_codes, generate_code_lengths, limited_code_lengths,
+                         canonical_code_table, table_to_codebook, build_code_table,
+                         group_code_lengths, ungroup_code_lengths, BitWriter, DecodeTables,
+                         TableDecoder, encode_bytes, xor_bytes, byte_code_table,
+                         BYTE_ENCODING, MAX_CODE_LENGTH)
+    from frequency import Histogram, byte_frequency
+    import wire
+
+CHUNK_SIZE = 1024 * 1024  # размер куска при потоковой обработке файлов
+KEY_ENV = "HUFFMAN_KEY"  # переменная окружения с ключом шифрования
 
 
 def build_huffman_tree(text):  #Построение дерева Хаффмана для текста
-    frequency = Counter(text) #Подсчет частот символов
-    heap = [HuffmanNode(char, freq) for char, freq in frequency.items()] #Создание начального списка узлов
-    heap.sort()  # Сортировка узлов по возрастанию частот
-
-    #Построение дерева путем объединения узлов
-    while len(heap) > 1:
-        left = heap.pop(0)  #Извлечение двух узлов с наименьшими частотами
-        right = heap.pop(0)
-
-        #Создание нового узла сумма частот
-        merged = HuffmanNode(None, left.freq + right.freq)
-        merged.left = left
-        merged.right = right
+    frequency = Histogram().update(text).most_common() #Подсчет частот символов
+    return build_tree(frequency)  # Объединение узлов через кучу, O(k log k)
 
-        #Добавление нового узла обратно в кучу
-        heap.append(merged)
-        heap.sort()
 
-    return heap[0]  # Возвращаем корень дерева
-
-
-def generate_huffman_codes(node, prefix="", codebook=None):   #Рекурсивная генерация кодов Хаффмана для символов
+def generate_huffman_codes(node, prefix="", codebook=None):   #Генерация кодов Хаффмана для символов
     if codebook is None:
         codebook = {}  # Инициализация словаря кодов
 
-    if node is not None:
-        if node.char is not None: # Если узел содержит символ
-            codebook[node.char] = prefix  # Сохраняем код для символа
-        generate_huffman_codes(node.left, prefix + "0", codebook) # Рекурсивный обход поддерева (добавляем '0' к префиксу)
-        generate_huffman_codes(node.right, prefix + "1", codebook)
+    codebook.update(generate_codes(node, prefix))  # Обход дерева без рекурсии
 
     return codebook
 
 
-def huffman_encode(text):  #Кодирование текста алгоритма Хаффмана и построение
-    root = build_huffman_tree(text)
-    huffman_codes = generate_huffman_codes(root) #Генерация кодов для символов
+def huffman_encode(text, max_code_length=None):  #Кодирование текста алгоритма Хаффмана и построение
+    frequency = Histogram().update(text).most_common()
+    huffman_codes = generate_codes(build_tree(frequency)) #Генерация кодов для символов
+
+    # Ограничение длины кода: длины по package-merge, коды канонические
+    if max_code_length is not None and max(map(len, huffman_codes.values())) > max_code_length:
+        lengths = limited_code_lengths(frequency, max_code_length)
+        huffman_codes = table_to_codebook(canonical_code_table(lengths))
+
     encoded_text = ''.join(huffman_codes[char] for char in text) # Кодирование текст
 
     return encoded_text, huffman_codes
 
 
 def huffman_decode(encoded_text, huffman_codes):  #Декодирование текста, закодированного методом Хаффмана
-    reverse_codes = {v: k for k, v in huffman_codes.items()}  # Создаем обратное отображение код: символ
+    if not encoded_text:
+        return ""
 
-    current_code = ""  # Накопление текущего кода
-    decoded_text = ""  # Результирующий декодированный текст
+    # Битовую строку переводим в байты и декодируем по таблице за линейное время
+    padding = (8 - len(encoded_text) % 8) % 8
+    data = int(encoded_text + '0' * padding, 2).to_bytes((len(encoded_text) + padding) // 8, 'big')
+    decoder = TableDecoder(DecodeTables(build_code_table(huffman_codes)))
 
-    # Последовательный анализ битов
-    for bit in encoded_text:
-        current_code += bit  # Добавляем очередной бит
-
-        # Проверяем, соответствует ли текущий код символу
-        if current_code in reverse_codes:
-            decoded_text += reverse_codes[current_code]  # Добавляем символ
-            current_code = ""  # Сбрасываем код для следующего символа
-
-    return decoded_text
+    return decoder.decode(data, padding)
 
 
 def xor_encrypt_decrypt_bytes(data_bytes, key):  #Функция шифрования дешифрования
-    key_length = len(key)
-    decrypted_bytes = bytearray()
+    key_bytes = bytes(ord(char) for char in key)  # Коды символов ключа (ValueError, если > 255)
 
-    # Применяем XOR для каждого байта с соответствующим символом
-    for i, byte in enumerate(data_bytes):
-        decrypted_byte = byte ^ ord(key[i % key_length]) # Циклическое использование ключа
-        decrypted_bytes.append(decrypted_byte)
-
-    return bytes(decrypted_bytes)
+    # Ключ размножается до длины данных, XOR применяется ко всему буферу сразу
+    return xor_bytes(data_bytes, key_bytes)
 
 
 def pad_text(text):  #Добавление паддинга (дополнения) к битовой строке
@@ -259,5 +252,238 @@ def main():
         else:
             print("Неверный выбор. Пожалуйста, выберите 1, 2 или 3.")
 
+
+def open_input(path):  #Открытие входа: файл или stdin
+    if path == '-':
+        # stdin нельзя пройти дважды и отобразить в память, поэтому копируем во временный файл
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(sys.stdin.buffer, spool, CHUNK_SIZE)
+        spool.seek(0)
+        return spool
+    return open(path, 'rb')
+
+
+def open_output(path):
+    if path == '-':
+        return open(sys.stdout.fileno(), 'wb', closefd=False)
+    return open(path, 'wb')
+
+
+def iter_text(data):  #Куски текста из байтов UTF-8 без загрузки всего файла
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield decoder.decode(data[start:start + CHUNK_SIZE])
+    yield decoder.decode(b'', final=True)
+
+
+def file_code_lengths(items, max_code_length=None):  #Длины канонических кодов по частотам
+    lengths = generate_code_lengths(build_tree(items))
+    if max_code_length is not None and max(lengths.values()) > max_code_length:
+        lengths = limited_code_lengths(items, max_code_length)
+    if len(lengths) == 1:
+        lengths = {char: 1 for char in lengths}  # иначе единственный символ получит пустой код
+    return lengths
+
+
+def header_table(header):  #Таблица кодов из заголовка кадра
+    if header["code_lengths"] is not None:
+        return canonical_code_table(ungroup_code_lengths(header["code_lengths"]))
+    if header["huffman_codes"] is not None:
+        return build_code_table(header["huffman_codes"])
+    raise ValueError("Кадр закодирован обученной кодовой книгой сервера.")
+
+
+def encode_file(source, target, key, max_code_length=None, binary=False):  #Сжатие и шифрование файла в двоичный кадр
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Проход 1: частоты символов по отображённому в память файлу
+        if binary:
+            items = byte_frequency(data)  # байтовый режим: любой файл, алфавит из 256 байтов
+        else:
+            histogram = Histogram()
+            for text in iter_text(data):
+                histogram.update(text)
+            items = histogram.most_common()
+
+        lengths = file_code_lengths(items, max_code_length)
+        table = canonical_code_table(lengths)
+
+        # Паддинг известен заранее, поэтому заголовок пишется до данных
+        total_bits = sum(freq * lengths[char] for char, freq in items)
+        padding = (8 - total_bits % 8) % 8
+        target.write(wire.pack_header(padding, code_lengths=group_code_lengths(lengths), binary=binary))
+
+        # Проход 2: кодирование и шифрование кусками фиксированного размера
+        if binary:
+            writer = BitWriter(byte_code_table(table))
+            chunks = (data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE))
+        else:
+            writer = BitWriter(table)
+            chunks = iter_text(data)
+        key_bytes = key.encode()
+        offset = 0
+        for text in chunks:
+            chunk = writer.write(text)
+            target.write(xor_bytes(chunk, key_bytes, offset))
+            offset += len(chunk)
+        chunk, _ = writer.flush()
+        target.write(xor_bytes(chunk, key_bytes, offset))
+
+
+def decode_file(source, target, key, block=None, workers=None):  #Расшифровка и распаковка двоичного кадра
+    if source.read(len(wire.BLOCKS_MAGIC)) == wire.BLOCKS_MAGIC:
+        decode_blocks(source, target, key, block, workers)
+        return
+    if block is not None:
+        raise ValueError("Вход не является блочным контейнером.")
+    source.seek(0)
+
+    header = wire.read_header(source)
+    decoder = TableDecoder(DecodeTables(header_table(header)))
+    encoding = BYTE_ENCODING if header["binary"] else 'utf-8'
+    key_bytes = key.encode()
+    offset = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(decoder.feed(xor_bytes(chunk, key_bytes, offset)).encode(encoding))
+        offset += len(chunk)
+    target.write(decoder.finish(header["padding"]).encode(encoding))
+
+
+def split_file_blocks(data, block_size):  #Границы блоков в байтах, не разрывающие символы UTF-8
+    start = 0
+    while start < len(data):
+        end = min(start + block_size, len(data))
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end += 1
+        yield start, end
+        start = end
+
+
+def encode_block(block, key, max_code_length=None, binary=False):  #Блок - независимый кадр со своей таблицей
+    if binary:
+        lengths = file_code_lengths(byte_frequency(block), max_code_length)
+        encoded, padding = encode_bytes(block, byte_code_table(canonical_code_table(lengths)))
+    else:
+        text = block.decode('utf-8')
+        lengths = file_code_lengths(Histogram().update(text).most_common(), max_code_length)
+        encoded, padding = encode_bytes(text, canonical_code_table(lengths))
+    return wire.pack_frame(xor_bytes(encoded, key.encode()), padding,
+                           code_lengths=group_code_lengths(lengths), binary=binary)
+
+
+def decode_block(frame, key):
+    header, offset = wire.unpack_header(frame)
+    decoder = TableDecoder(DecodeTables(header_table(header)))
+    text = decoder.decode(xor_bytes(frame[offset:], key.encode()), header["padding"])
+    return text.encode(BYTE_ENCODING if header["binary"] else 'utf-8')
+
+
+def map_blocks(pool, workers, func, blocks, *args):  #Параллельная обработка, в памяти не больше 2 блоков на процесс
+    window = deque()
+    for block in blocks:
+        window.append(pool.submit(func, block, *args))
+        if len(window) >= workers * 2:
+            yield window.popleft().result()
+    while window:
+        yield window.popleft().result()
+
+
+def encode_blocks(source, target, key, block_size, max_code_length=None, workers=None, binary=False):  #Сжатие блоками в параллельных процессах
+    workers = workers or os.cpu_count() or 1
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        if binary:
+            bounds = ((start, min(start + block_size, len(data))) for start in range(0, len(data), block_size))
+        else:
+            bounds = split_file_blocks(data, block_size)
+        blocks = (data[start:end] for start, end in bounds)
+        writer = wire.BlockWriter(target)
+        for frame in map_blocks(pool, workers, encode_block, blocks, key, max_code_length, binary):
+            writer.add(frame)
+        writer.close()
+
+
+def decode_blocks(source, target, key, block=None, workers=None):  #Распаковка контейнера, с block - только блок N
+    index = wire.read_block_index(source)
+    if block is not None:
+        if not 0 <= block < len(index):
+            raise ValueError(f"Блока {block} нет, всего блоков: {len(index)}.")
+        index = [index[block]]
+
+    def frames():
+        for offset, length in index:
+            source.seek(offset)
+            yield source.read(length)
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for text in map_blocks(pool, workers, decode_block, frames(), key):
+            target.write(text)
+
+
+def read_key(key_file, input_path):  #Ключ не принимается аргументом: аргументы видны в ps и истории оболочки
+    if key_file is not None:
+        with open(key_file, encoding='utf-8') as f:
+            key = f.readline().rstrip('\r\n')
+    elif os.environ.get(KEY_ENV):
+        key = os.environ[KEY_ENV]
+    elif input_path != '-':
+        # stdin свободен от данных: ключ - первая строка stdin или ввод без эха в терминале
+        key = getpass.getpass("Ключ шифрования: ") if sys.stdin.isatty() else sys.stdin.readline().rstrip('\r\n')
+    else:
+        raise ValueError(f"Ключ не задан: укажите --key-file или переменную {KEY_ENV}.")
+    if not key:
+        raise ValueError("Пустой ключ.")
+    return key
+
+
+def run_cli(argv):  #Неинтерактивный режим для пакетных заданий
+    parser = argparse.ArgumentParser(description="Сжатие Хаффманом и XOR-шифрование файлов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encode_parser = commands.add_parser("encode", help="сжать и зашифровать")
+    encode_parser.add_argument("--max-code-length", type=int, default=None,
+                               help="ограничение длины кода в битах")
+    encode_parser.add_argument("--block-size", type=int, default=None,
+                               help="размер блока в байтах: блоки сжимаются независимо и параллельно")
+    encode_parser.add_argument("--binary", action="store_true",
+                               help="байтовый режим для любых файлов, а не только текста UTF-8")
+    decode_parser = commands.add_parser("decode", help="расшифровать и распаковать")
+    decode_parser.add_argument("--block", type=int, default=None,
+                               help="распаковать только блок с этим номером")
+    for command in (encode_parser, decode_parser):
+        command.add_argument("-i", "--input", default='-', help="входной файл (по умолчанию stdin)")
+        command.add_argument("-o", "--output", default='-', help="выходной файл (по умолчанию stdout)")
+        command.add_argument("--key-file", default=None,
+                             help=f"файл с ключом шифрования; без него ключ берётся из {KEY_ENV} или stdin")
+        command.add_argument("-j", "--jobs", type=int, default=None,
+                             help="число процессов для блоков (по умолчанию - число ядер)")
+
+    args = parser.parse_args(argv)
+    if args.command == "encode" and args.block_size is not None and args.block_size < 1:
+        parser.error("--block-size должен быть положительным")
+    if args.command == "encode" and args.max_code_length is not None \
+            and not 1 <= args.max_code_length <= MAX_CODE_LENGTH:
+        parser.error(f"--max-code-length должен быть от 1 до {MAX_CODE_LENGTH}")
+    try:
+        key = read_key(args.key_file, args.input)
+        with open_input(args.input) as source, open_output(args.output) as target:
+            if args.command == "encode" and args.block_size is not None:
+                encode_blocks(source, target, key, args.block_size, args.max_code_length, args.jobs,
+                              args.binary)
+            elif args.command == "encode":
+                encode_file(source, target, key, args.max_code_length, args.binary)
+            else:
+                decode_file(source, target, key, args.block, args.jobs)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -1,46 +1,126 @@
-from fastapi import FastAPI, HTTPException, Response, Depends, Request, status
+from contextlib import asynccontextmanager
+import codecs
+import itertools
+import tempfile
+import time
+
+from fastapi import FastAPI, HTTPException, Response, Depends, Request, Header, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from sqlalchemy import select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from starlette.background import BackgroundTask
+from pydantic import ValidationError
 import jwt
 
-from app.models import UserModel
-from app.schemas import UserEmPasSchema, EncodeResponse, Data
-from app.cruds import SessionDep
+from app.models import UserModel, CodebookModel
+from app.schemas import UserEmPasSchema, EncodeResponse, Data, CodebookSchema
+from app.cruds import SessionDep, ReadSessionDep, engine, read_engine
 from app.core import security, config
-from app.services import Coding
+from app.services import (Coding, LRUCache, MODEL_CACHE_SIZE, compress_and_encrypt,
+                          decrypt_and_decompress, compress_to_frame, decompress_frame, train_codebook,
+                          compress_batch, decompress_batch, compress_blocks, decompress_blocks,
+                          compress_binary_to_frame, decompress_binary_frame)
+from app.frequency import Histogram
+from app.huffman import CodeLengthError, MAX_CODE_LENGTH
+from app import wire, metrics
+from app.executor import CodingExecutor, ExecutorBusy
 
-app = FastAPI()
+coding_executor = CodingExecutor()
+codebook_rows = LRUCache(MODEL_CACHE_SIZE, "codebook_rows")  # обученные кодовые книги не меняются, держим их в памяти
 
 
-@app.post("/sign-up/", status_code=status.HTTP_201_CREATED)
-async def sign_up(data: UserEmPasSchema, session: SessionDep):
-    try:
-        # Проверяем существование пользователя
-        existing_user = await session.scalar(
-            select(UserModel).where(UserModel.email == data.email)
-        )
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    coding_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # размер куска при потоковой обработке
+STREAM_SPOOL_SIZE = 16 * 1024 * 1024  # тела больше этого размера уходят во временный файл
+
 
-        if existing_user:
+async def spool_body(request):
+    # Тело запроса складываем во временный файл, чтобы пройти по нему дважды
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_SIZE)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def read_chunks(file):
+    return iter(lambda: file.read(STREAM_CHUNK_SIZE), b'')
+
+
+def read_text_chunks(file):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in read_chunks(file):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+async def load_codebook(session, model_id):
+    codebook = codebook_rows.get(model_id)
+    if codebook is None:
+        row = await session.get(CodebookModel, model_id)
+        if row is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Пользователь с таким email уже зарегистрирован."
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Кодовая книга не найдена"
             )
+        codebook = {"id": row.id, "code_lengths": row.code_lengths, "escape_length": row.escape_length}
+        codebook_rows.put(model_id, codebook)
+    return codebook
+
+
+def header_key(x_key):
+    # Ключ XOR потоковых и двоичных эндпоинтов идёт в заголовке, а не в URL,
+    # чтобы не оседать в логах доступа и прокси. Заголовки Starlette читает
+    # как latin-1, а клиент шлёт ключ байтами UTF-8, как и в JSON-теле /encode
+    try:
+        return x_key.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ключ в X-Key должен быть в кодировке UTF-8"
+        )
+
+
+def xor_key(x_key: str = Header(alias="X-Key")):
+    return header_key(x_key)
 
-        # Создаем нового пользователя
-        new_user = UserModel(email=data.email, password=data.password)
-        session.add(new_user)
-        await session.commit()
 
-        # Генерируем токен
-        access_token = security.create_access_token(uid=str(new_user.id))
+def optional_xor_key(x_key: str | None = Header(None, alias="X-Key")):
+    # /decode принимает и JSON с ключом в теле, и двоичный кадр без ключа
+    return header_key(x_key) if x_key is not None else None
 
-        return {
-            "message": "Добавлен новый пользователь",
-            "id": new_user.id,
-            "email": new_user.email,
-            "token": access_token
-        }
 
+def count_frequency(file):
+    histogram = Histogram()
+    for text in read_text_chunks(file):
+        histogram.update(text)
+    file.seek(0)
+    return histogram.most_common()
+
+
+@app.post("/sign-up/", status_code=status.HTTP_201_CREATED)
+async def sign_up(data: UserEmPasSchema, session: SessionDep):
+    # Один INSERT: повторный email отсекает уникальный индекс users.email,
+    # без предварительного SELECT и без гонки между проверкой и вставкой
+    new_user = UserModel(email=data.email, password=data.password)
+    session.add(new_user)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь с таким email уже зарегистрирован."
+        )
     except SQLAlchemyError:
         await session.rollback()
         raise HTTPException(
@@ -48,9 +128,19 @@ async def sign_up(data: UserEmPasSchema, session: SessionDep):
             detail="Ошибка при создании пользователя"
         )
 
+    # Генерируем токен
+    access_token = security.create_access_token(uid=str(new_user.id))
+
+    return {
+        "message": "Добавлен новый пользователь",
+        "id": new_user.id,
+        "email": new_user.email,
+        "token": access_token
+    }
+
 
 @app.post("/login/")
-async def login(data: UserEmPasSchema, session: SessionDep, response: Response):
+async def login(data: UserEmPasSchema, session: ReadSessionDep, response: Response):
     # Проверяем существование пользователя
     user = await session.scalar(
         select(UserModel).where(
@@ -83,7 +173,7 @@ async def login(data: UserEmPasSchema, session: SessionDep, response: Response):
 
 
 @app.get("/users/me/")
-async def user_data(request: Request, session: SessionDep):
+async def user_data(request: Request, session: ReadSessionDep):
     access_token = request.cookies.get(config.JWT_ACCESS_COOKIE_NAME)
 
     if not access_token:
@@ -93,11 +183,12 @@ async def user_data(request: Request, session: SessionDep):
         )
 
     try:
-        decoded_token = jwt.decode(
-            access_token,
-            config.JWT_SECRET_KEY,
-            algorithms=["HS256"]
-        )
+        with metrics.stage("jwt_decode"):
+            decoded_token = jwt.decode(
+                access_token,
+                config.JWT_SECRET_KEY,
+                algorithms=["HS256"]
+            )
         user_id = decoded_token.get("sub")
 
         if not user_id:
@@ -128,25 +219,314 @@ async def user_data(request: Request, session: SessionDep):
         )
 
 
-@app.post("/encode", response_model=EncodeResponse, dependencies=[Depends(security.access_token_required)])
-async def encode(data: Data):
+@app.post("/encode", response_model=EncodeResponse, response_model_exclude_none=True,
+          dependencies=[Depends(security.access_token_required)])
+async def encode(data: Data, request: Request, session: ReadSessionDep, model: int | None = None,
+                 block_size: int | None = Query(default=None, ge=1)):
+    # С ?model=<id> текст кодируется обученной кодовой книгой, коды в ответ не попадают.
+    # С ?block_size=N текст режется на блоки по N символов, блоки кодируются
+    # параллельно, ответ - двоичный блочный контейнер
+    codebook = await load_codebook(session, model) if model is not None else None
+    try:
+        if block_size is not None:
+            blocks = Coding().split_blocks(data.text, block_size)
+            frames = await coding_executor.map(compress_blocks, blocks, data.key, data.canonical, codebook,
+                                               data.max_code_length, size=len(data.text))
+            return Response(content=wire.pack_blocks(frames), media_type=wire.MEDIA_TYPE)
+        # Клиент, принимающий application/octet-stream, получает двоичный кадр вместо JSON с hex
+        if wire.MEDIA_TYPE in request.headers.get("accept", ""):
+            frame = await coding_executor.run(compress_to_frame, data, codebook, size=len(data.text))
+            return Response(content=frame, media_type=wire.MEDIA_TYPE)
+        return await coding_executor.run(compress_and_encrypt, data, codebook, size=len(data.text))
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+    except CodeLengthError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при кодировании: {str(e)}"
+        )
+
+
+@app.post("/encode/binary", dependencies=[Depends(security.access_token_required)],
+          openapi_extra={"requestBody": {"content": {
+              wire.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+          }, "required": True}})
+async def encode_binary(request: Request, canonical: bool = False,
+                        max_code_length: int | None = Query(None, ge=1, le=MAX_CODE_LENGTH),
+                        key: str = Depends(xor_key)):
+    # Произвольный файл в байтовом режиме, ответ - двоичный кадр; /decode вернёт исходные байты
+    body = await request.body()
     try:
+        frame = await coding_executor.run(compress_binary_to_frame, body, key, canonical,
+                                          max_code_length, size=len(body))
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+    except CodeLengthError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при кодировании: {str(e)}"
+        )
+    return Response(content=frame, media_type=wire.MEDIA_TYPE)
+
+
+@app.post("/decode", dependencies=[Depends(security.access_token_required)],
+          openapi_extra={"requestBody": {"content": {
+              "application/json": {"schema": EncodeResponse.model_json_schema()},
+              wire.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+          }, "required": True}})
+async def decode(request: Request, session: ReadSessionDep, block: int | None = Query(default=None, ge=0),
+                 key: str | None = Depends(optional_xor_key)):
+    # Блочный контейнер декодируется целиком параллельно или, с ?block=N, только блок N.
+    # Ключ двоичного кадра в кадре не хранится и приходит в заголовке X-Key
+    body = await request.body()
+    frame = request.headers.get("content-type", "").startswith(wire.MEDIA_TYPE)
+    if frame:
+        if key is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Для двоичного кадра нужен ключ в заголовке X-Key"
+            )
+    else:
+        try:
+            payload = EncodeResponse.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+    try:
+        if frame and wire.is_blocks(body):
+            if block is not None:
+                frames = [bytes(wire.unpack_block(body, block))]
+            else:
+                frames = [bytes(frame) for frame in wire.unpack_blocks(body)]
+            fields = wire.unpack_header(frames[0])[0] if frames else {"model": None, "binary": False}
+            model = fields["model"]
+            codebook = await load_codebook(session, model) if model is not None else None
+            texts = await coding_executor.map(decompress_blocks, frames, key, codebook, size=len(body))
+            if fields["binary"]:
+                return Response(content=b''.join(texts), media_type=wire.MEDIA_TYPE)
+            return {"decoded_text": ''.join(texts)}
+        if frame:
+            fields = wire.unpack_header(body)[0]
+            if fields["binary"]:
+                # Кадр байтового режима: в ответе исходные байты, а не JSON
+                data = await coding_executor.run(decompress_binary_frame, body, key, size=len(body))
+                return Response(content=data, media_type=wire.MEDIA_TYPE)
+            model = fields["model"]
+            codebook = await load_codebook(session, model) if model is not None else None
+            return await coding_executor.run(decompress_frame, body, key, codebook, size=len(body))
+        codebook = await load_codebook(session, payload.model) if payload.model is not None else None
+        return await coding_executor.run(decrypt_and_decompress, payload, codebook, size=len(body))
+    except HTTPException:
+        raise
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при декодировании: {str(e)}"
+        )
+
+
+@app.post("/encode/batch", dependencies=[Depends(security.access_token_required)])
+async def encode_batch(data: list[Data], session: ReadSessionDep, model: int | None = None):
+    # Результаты в порядке запроса: {"result": ...} или {"error": ...} для каждого сообщения
+    codebook = await load_codebook(session, model) if model is not None else None
+    try:
+        return await coding_executor.map(compress_batch, data, codebook,
+                                         size=sum(len(item.text) for item in data))
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+
+
+@app.post("/decode/batch", dependencies=[Depends(security.access_token_required)])
+async def decode_batch(data: list[EncodeResponse], session: ReadSessionDep):
+    codebooks = {}
+    for model in {item.model for item in data if item.model is not None}:
+        try:
+            codebooks[model] = await load_codebook(session, model)
+        except HTTPException:
+            # Сообщения с неизвестной кодовой книгой получат ошибку на своих местах
+            pass
+    try:
+        return await coding_executor.map(decompress_batch, data, codebooks,
+                                         size=sum(len(item.encoded_data) for item in data))
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+
+
+@app.post("/encode/stream", dependencies=[Depends(security.access_token_required)])
+async def encode_stream(request: Request, canonical: bool = False,
+                        max_code_length: int | None = Query(None, ge=1, le=MAX_CODE_LENGTH),
+                        key: str = Depends(xor_key)):
+    spool = await spool_body(request)
+    try:
+        frequency = await run_in_threadpool(count_frequency, spool)
+        if not frequency:
+            raise ValueError("Пустой текст.")
         huffman_coding = Coding()
-        return huffman_coding.compress_and_encrypt(data)
+        header = huffman_coding.prepare_codes(frequency, canonical, max_code_length)
+    except ValueError as e:
+        spool.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ошибка при кодировании: {str(e)}"
+        )
     except Exception as e:
+        spool.close()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при кодировании: {str(e)}"
         )
 
+    # Ответ - двоичный кадр: таблица кодов идёт в начале тела, а не в заголовках
+    # HTTP, которые у большого алфавита не пропустят сервер или прокси
+    preamble = wire.pack_header(header["padding"], header.get("huffman_codes"), header.get("code_lengths"))
+    headers = {"X-Padding": str(header["padding"])}
+    if "extra_bits" in header:
+        headers["X-Extra-Bits"] = str(header["extra_bits"])
+
+    return StreamingResponse(
+        itertools.chain([preamble], huffman_coding.encode_stream(read_text_chunks(spool), key)),
+        media_type=wire.MEDIA_TYPE,
+        headers=headers,
+        background=BackgroundTask(spool.close)
+    )
+
 
-@app.post("/decode", dependencies=[Depends(security.access_token_required)])
-async def decode(data: EncodeResponse):
+@app.post("/decode/stream", dependencies=[Depends(security.access_token_required)],
+          openapi_extra={"requestBody": {"content": {
+              wire.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+          }, "required": True}})
+async def decode_stream(request: Request, key: str = Depends(xor_key)):
+    # Тело - кадр от /encode/stream: таблица кодов и паддинг читаются из его начала
+    spool = await spool_body(request)
     try:
+        fields = wire.read_header(spool)
+        if fields["model"] is not None or fields["binary"]:
+            raise ValueError("Потоком декодируются только текстовые кадры со своей таблицей кодов.")
         huffman_coding = Coding()
-        return huffman_coding.decrypt_and_decompress(data)
+        chunks = huffman_coding.decode_stream(
+            read_chunks(spool), key, fields["padding"],
+            huffman_codes=fields["huffman_codes"],
+            code_lengths=fields["code_lengths"]
+        )
+    except ValueError as e:
+        # Сюда же попадают UnicodeDecodeError и JSONDecodeError битой таблицы
+        spool.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ошибка при декодировании: {str(e)}"
+        )
     except Exception as e:
+        spool.close()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при декодировании: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+    return StreamingResponse(
+        chunks,
+        media_type="text/plain; charset=utf-8",
+        background=BackgroundTask(spool.close)
+    )
+
+
+@app.post("/codebooks", status_code=status.HTTP_201_CREATED,
+          dependencies=[Depends(security.access_token_required)])
+async def create_codebook(data: CodebookSchema, session: SessionDep):
+    # Обучает кодовую книгу на образце и сохраняет её для /encode?model=<id>
+    if not data.sample:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пустой образец текста"
+        )
+    try:
+        code_lengths, escape_length = await coding_executor.run(
+            train_codebook, data.sample, size=len(data.sample)
+        )
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже"
+        )
+
+    codebook = CodebookModel(name=data.name, code_lengths=code_lengths, escape_length=escape_length)
+    session.add(codebook)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Кодовая книга с таким именем уже существует."
+        )
+
+    return {
+        "message": "Кодовая книга сохранена",
+        "id": codebook.id,
+        "name": codebook.name,
+        "symbols": sum(len(symbols) for symbols in code_lengths.values())
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Текстовый формат Prometheus; при METRICS_ENABLED=0 эндпоинт отключён
+    if not metrics.ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Метрики отключены"
+        )
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+ROUTE_PATHS = {route.path for route in app.routes}  # метка path только для известных путей
+
+if metrics.ENABLED:
+    for db_engine in {engine, read_engine}:
+        metrics.instrument_engine(db_engine.sync_engine)
+    metrics.add_gauge("coding_executor_pending", "Задачи кодирования в пуле",
+                      lambda: coding_executor.pending)
+
+    @app.middleware("http")
+    async def track_requests(request: Request, call_next):
+        # Для потоковых ответов время считается до отправки заголовков
+        path = request.url.path if request.url.path in ROUTE_PATHS else "other"
+        size = request.headers.get("content-length")
+        if size is not None and size.isdigit():
+            metrics.REQUEST_BYTES.observe(int(size), path)
+        metrics.IN_FLIGHT.inc(path)
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics.IN_FLIGHT.dec(path)
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, path, status_code)
@@ -0,0 +1,60 @@
+import random
+import time
+
+from app.schemas import Data
+from app.services import Coding, DecodeTables, TableDecoder
+
+# Запуск из каталога над пакетом app:
+#   python -m app.benchmarks.bench_decode
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя АБВГД abcdefghijklmnopqrstuvwxyz .,!?-0123456789"
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 3
+
+
+def make_text(size, seed=0):
+    rnd = random.Random(seed)
+    # Неравномерное распределение, как в обычном тексте
+    weights = [1 / (i + 1) for i in range(len(ALPHABET))]
+    return ''.join(rnd.choices(ALPHABET, weights=weights, k=size))
+
+
+def best_of(func):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def tree_decode(coding, decrypted_bytes, padding):
+    bits = ''.join(f'{b:08b}' for b in decrypted_bytes)
+    bits = bits[:len(bits) - padding]
+    return coding.decode(bits, coding.build_tree_from_codebook())
+
+
+def table_decode(coding, decrypted_bytes, padding):
+    return TableDecoder(DecodeTables(coding.build_code_table())).decode(decrypted_bytes, padding)
+
+
+def main():
+    print(f"{'символов':>10} {'дерево, с':>10} {'таблица, с':>11} {'ускорение':>10}")
+    for size in SIZES:
+        text = make_text(size)
+        response = Coding().compress_and_encrypt(Data(text=text, key="benchmark"))
+
+        coding = Coding()
+        coding.codebook = response.huffman_codes
+        decrypted_bytes = coding.xor_decrypt_bytes(response.encoded_data, response.key)
+
+        tree_time, tree_text = best_of(lambda: tree_decode(coding, decrypted_bytes, response.padding))
+        table_time, table_text = best_of(lambda: table_decode(coding, decrypted_bytes, response.padding))
+        assert tree_text == table_text == text
+
+        print(f"{size:>10} {tree_time:>10.4f} {table_time:>11.4f} {tree_time / table_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
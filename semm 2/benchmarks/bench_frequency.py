@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+from app.benchmarks.bench_decode import make_text, best_of
+from app.frequency import Histogram, merge_histograms
+
+# Запуск из каталога над пакетом app:
+#   python -m app.benchmarks.bench_frequency
+
+SIZES = [40, 1_000, 100_000, 1_000_000, 10_000_000]
+CHUNK_SIZE = 1024 * 1024
+EMOJI = "😀🚀✓€漢字かなカナ"
+
+
+def make_corpus(corpus, size, seed=0):
+    # cyrillic - только низ BMP; emoji - тот же текст с редкими символами
+    # вне BMP; astral - разреженные номера вплоть до U+10FFFF
+    text = make_text(size, seed)
+    if corpus == "cyrillic":
+        return text
+    rnd = random.Random(seed)
+    extra = EMOJI if corpus == "emoji" else EMOJI + "\U0001F9FF\U000E0001\U0010FFFF"
+    chars = list(text)
+    for i in rnd.sample(range(size), max(1, size // 50)):
+        chars[i] = rnd.choice(extra)
+    return ''.join(chars)
+
+
+def counter_frequency(text):
+    return Counter(text).most_common()
+
+
+def histogram_frequency(text):
+    return Histogram().update(text).most_common()
+
+
+def chunked_frequency(text):
+    # Гистограммы кусков по отдельности, затем слияние - как у воркеров
+    return merge_histograms(Histogram().update(text[i:i + CHUNK_SIZE])
+                            for i in range(0, len(text), CHUNK_SIZE)).most_common()
+
+
+def per_call(func, size):
+    # Короткие тексты прогоняются много раз, чтобы время было измеримым
+    calls = max(1, 100_000 // size)
+    seconds, result = best_of(lambda: [func() for _ in range(calls)][-1])
+    return seconds / calls, result
+
+
+def main():
+    print(f"{'корпус':<9} {'символов':>10} {'Counter, мкс':>13} {'numpy, мкс':>11} {'по кускам, мкс':>15} {'ускорение':>10}")
+    for corpus in ("cyrillic", "emoji", "astral"):
+        for size in SIZES:
+            text = make_corpus(corpus, size)
+            counter_time, expected = per_call(lambda: counter_frequency(text), size)
+            histogram_time, result = per_call(lambda: histogram_frequency(text), size)
+            chunked_time, chunked = per_call(lambda: chunked_frequency(text), size)
+            # Совпадает и порядок: при равных частотах - первое появление, как у Counter
+            assert result == chunked == expected
+
+            print(f"{corpus:<9} {size:>10} {counter_time * 1e6:>13.1f} {histogram_time * 1e6:>11.1f} "
+                  f"{chunked_time * 1e6:>15.1f} {counter_time / histogram_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import base64
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import httpx
+
+from app import Shifrovanie
+from app.api import app, coding_executor
+from app.core import security, config
+from app.frequency import Histogram
+from app.huffman import BitWriter, DecodeTables, TableDecoder, xor_bytes
+from app.schemas import Data
+from app.services import Coding
+
+# Запуск из каталога над пакетом app:
+#   python -m app.benchmarks.bench_suite --output results.json
+#   python -m app.benchmarks.bench_suite --compare results.json   # сравнение с прошлым прогоном
+
+ALPHABETS = {
+    "latin": "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJ .,!?-0123456789",
+    "cyrillic": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя АБВГД .,!?-0123456789",
+    "mixed": "абвгдеёжзий abcdefghij 0123456789 .,!? 漢字かなカナ 😀🚀✓€",
+}
+DISTRIBUTIONS = ["zipf", "uniform", "skewed", "mixed"]
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 3
+KEY = "benchmark"
+
+
+def make_corpus(distribution, size, seed=0):
+    # Синтетический текст: распределение символов задаёт размер и форму таблицы кодов
+    rnd = random.Random(seed)
+    if distribution == "uniform":
+        alphabet = ALPHABETS["cyrillic"]
+        weights = None
+    elif distribution == "skewed":
+        # Один символ занимает 90% текста
+        alphabet = ALPHABETS["latin"]
+        weights = [0.9] + [0.1 / (len(alphabet) - 1)] * (len(alphabet) - 1)
+    elif distribution == "mixed":
+        alphabet = ALPHABETS["mixed"]
+        weights = [1 / (i + 1) for i in range(len(alphabet))]
+    else:
+        alphabet = ALPHABETS["cyrillic"]
+        weights = [1 / (i + 1) for i in range(len(alphabet))]
+    return ''.join(rnd.choices(alphabet, weights=weights, k=size))
+
+
+def best_of(func, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(func):
+    # Пик выделенной Python-памяти за один вызов, в байтах
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def mb_per_s(size, seconds):
+    return round(size / seconds / 1e6, 2) if seconds else None
+
+
+def stage_breakdown(text, repeats):
+    # Этапы compress_and_encrypt и decrypt_and_decompress по отдельности
+    coding = Coding()
+    stages = {}
+    stages["count"], frequency = best_of(lambda: Histogram().update(text).most_common(), repeats)
+
+    def build():
+        coding.codebook = coding.generate_codes(coding.build_tree(frequency))
+        return coding.build_code_table()
+    stages["tree"], table = best_of(build, repeats)
+
+    stages["encode"], _ = best_of(lambda: BitWriter(table).write(text), repeats)
+    writer = BitWriter(table)
+    encoded = writer.write(text)
+    # flush дописывает неполный байт с паддингом и сбрасывает состояние, поэтому один раз
+    stages["pad"], (tail, padding) = best_of(writer.flush, 1)
+    encoded += tail
+
+    key_bytes = KEY.encode()
+    stages["xor"], encrypted = best_of(lambda: xor_bytes(encoded, key_bytes), repeats)
+    stages["hex"], hex_data = best_of(encrypted.hex, repeats)
+
+    stages["unhex"], raw = best_of(lambda: bytes.fromhex(hex_data), repeats)
+    stages["unxor"], decrypted = best_of(lambda: xor_bytes(raw, key_bytes), repeats)
+    stages["decode_tables"], tables = best_of(lambda: DecodeTables(table), repeats)
+    stages["decode"], decoded = best_of(lambda: TableDecoder(tables).decode(decrypted, padding), repeats)
+    assert decoded == text or len(set(text)) == 1
+
+    return {name: round(seconds * 1000, 3) for name, seconds in stages.items()}
+
+
+def bench_codec(distribution, size, repeats):
+    text = make_corpus(distribution, size)
+    data = Data(text=text, key=KEY)
+    size_bytes = len(text.encode())
+
+    encode_time, response = best_of(lambda: Coding().compress_and_encrypt(data), repeats)
+    decode_time, result = best_of(lambda: Coding().decrypt_and_decompress(response), repeats)
+    assert result["decoded_text"] == text or len(set(text)) == 1
+
+    return {
+        "distribution": distribution,
+        "chars": size,
+        "bytes": size_bytes,
+        "symbols": len(response.huffman_codes),
+        "ratio": round(len(response.encoded_data) / 2 / size_bytes, 4),
+        "encode_mb_s": mb_per_s(size_bytes, encode_time),
+        "decode_mb_s": mb_per_s(size_bytes, decode_time),
+        "encode_peak_bytes": peak_memory(lambda: Coding().compress_and_encrypt(data)),
+        "decode_peak_bytes": peak_memory(lambda: Coding().decrypt_and_decompress(response)),
+        "stages_ms": stage_breakdown(text, repeats),
+    }
+
+
+def bench_shifrovanie(distribution, size, repeats):
+    # Путь интерактивного режима Shifrovanie.py: коды, паддинг, XOR, base64
+    text = make_corpus(distribution, size)
+    size_bytes = len(text.encode())
+
+    def encode():
+        encoded_text, codes = Shifrovanie.huffman_encode(text)
+        padded_text, padding = Shifrovanie.pad_text(encoded_text)
+        encrypted = Shifrovanie.xor_encrypt_decrypt_bytes(padded_text.encode('utf-8'), KEY)
+        return base64.b64encode(encrypted).decode('utf-8'), codes, padding
+
+    def decode(encoded):
+        data_b64, codes, padding = encoded
+        padded_text = Shifrovanie.xor_encrypt_decrypt_bytes(base64.b64decode(data_b64), KEY).decode('utf-8')
+        return Shifrovanie.huffman_decode(Shifrovanie.unpad_text(padded_text, padding), codes)
+
+    encode_time, encoded = best_of(encode, repeats)
+    decode_time, decoded = best_of(lambda: decode(encoded), repeats)
+    assert decoded == text or len(set(text)) == 1
+
+    return {
+        "distribution": distribution,
+        "chars": size,
+        "bytes": size_bytes,
+        "encode_mb_s": mb_per_s(size_bytes, encode_time),
+        "decode_mb_s": mb_per_s(size_bytes, decode_time),
+        "encode_peak_bytes": peak_memory(encode),
+    }
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def load_test(client, path, requests, concurrency, **kwargs):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    total = time.perf_counter() - start
+    return {
+        "endpoint": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(requests / total, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def bench_http(sizes, requests, concurrency):
+    # Нагрузка на /encode и /decode внутри процесса, без сети
+    token = security.create_access_token(uid="benchmark")
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark",
+                                     cookies={config.JWT_ACCESS_COOKIE_NAME: token},
+                                     timeout=None) as client:
+            for size in sizes:
+                text = make_corpus("zipf", size)
+                payload = Data(text=text, key=KEY).model_dump()
+                encoded = Coding().compress_and_encrypt(Data(text=text, key=KEY)).model_dump(exclude_none=True)
+                for path, body in (("/encode", payload), ("/decode", encoded)):
+                    result = await load_test(client, path, requests, concurrency, json=body)
+                    result["chars"] = size
+                    results.append(result)
+    finally:
+        coding_executor.shutdown()
+    return results
+
+
+def compare(results, baseline):
+    # Печатает изменение пропускной способности относительно прошлого прогона
+    def keyed(section, fields):
+        return {tuple(item[f] for f in fields): item for item in section}
+
+    print("\nСравнение с базовым прогоном (больше 1 - быстрее):")
+    for section, fields, metrics in (("codec", ("distribution", "chars"), ("encode_mb_s", "decode_mb_s")),
+                                     ("shifrovanie", ("distribution", "chars"), ("encode_mb_s", "decode_mb_s")),
+                                     ("http", ("endpoint", "chars"), ("rps",))):
+        old = keyed(baseline.get(section, []), fields)
+        for key, item in keyed(results.get(section, []), fields).items():
+            if key not in old:
+                continue
+            for metric in metrics:
+                if item[metric] and old[key][metric]:
+                    ratio = item[metric] / old[key][metric]
+                    mark = "  <- медленнее" if ratio < 0.9 else ""
+                    print(f"  {section:<12} {'/'.join(map(str, key)):<22} {metric:<12} {ratio:6.2f}x{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки кодека Хаффмана/XOR и HTTP-эндпоинтов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="размеры текста в символах")
+    parser.add_argument("--distributions", nargs="+", default=DISTRIBUTIONS, choices=DISTRIBUTIONS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--http-sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--http-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json", help="куда сохранить результаты")
+    parser.add_argument("--compare", default=None, help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+        },
+        "codec": [],
+        "shifrovanie": [],
+        "http": [],
+    }
+
+    print(f"{'распределение':<14} {'символов':>10} {'кодир., МБ/с':>13} {'декод., МБ/с':>13} {'пик, МБ':>8}")
+    for distribution in args.distributions:
+        for size in args.sizes:
+            item = bench_codec(distribution, size, args.repeats)
+            results["codec"].append(item)
+            print(f"{distribution:<14} {size:>10} {item['encode_mb_s']:>13} {item['decode_mb_s']:>13} "
+                  f"{item['encode_peak_bytes'] / 1e6:>8.1f}")
+            print("    этапы, мс: " + ", ".join(f"{name} {ms}" for name, ms in item["stages_ms"].items()))
+            results["shifrovanie"].append(bench_shifrovanie(distribution, size, args.repeats))
+
+    if not args.skip_http:
+        results["http"] = asyncio.run(bench_http(args.http_sizes, args.http_requests, args.concurrency))
+        for item in results["http"]:
+            print(f"{item['endpoint']:<8} {item['chars']:>8} символов: {item['rps']} запр/с, "
+                  f"p50 {item['p50_ms']} мс, p95 {item['p95_ms']} мс, p99 {item['p99_ms']} мс, "
+                  f"ошибок {item['errors']}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import metrics
+
+
+# Настройки пула задач кодирования (переопределяются переменными окружения)
+PROCESS_WORKERS = int(os.getenv("CODING_PROCESS_WORKERS", os.cpu_count() or 1))
+THREAD_WORKERS = int(os.getenv("CODING_THREAD_WORKERS", 4))
+SMALL_PAYLOAD_SIZE = int(os.getenv("CODING_SMALL_PAYLOAD_SIZE", 64 * 1024))  # до этого размера - в потоке
+MAX_PENDING = int(os.getenv("CODING_MAX_PENDING", 64))  # сколько задач может ждать одновременно
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+class WorkerLost(ExecutorBusy):
+    # Процесс пула упал (например, убит за память). Задача не выполнена,
+    # пул пересоздаётся при следующем запросе, поэтому ответ тот же, что при перегрузке
+    pass
+
+
+class CodingExecutor:
+    # Выносит CPU-работу Coding из цикла событий: маленькие задачи идут
+    # в пул потоков, большие - в пул процессов, чтобы занять все ядра.
+    # Очередь ограничена: при переполнении run бросает ExecutorBusy
+    def __init__(self, process_workers=PROCESS_WORKERS, thread_workers=THREAD_WORKERS,
+                 small_payload_size=SMALL_PAYLOAD_SIZE, max_pending=MAX_PENDING):
+        self.process_workers = process_workers
+        self.thread_workers = thread_workers
+        self.small_payload_size = small_payload_size
+        self.max_pending = max_pending
+        self.pending = 0
+        self.process_pool = None
+        self.thread_pool = None
+
+    def get_pool(self, size):
+        if size < self.small_payload_size or self.process_workers <= 0:
+            if self.thread_pool is None:
+                self.thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers)
+            return self.thread_pool
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self.process_pool
+
+    async def run(self, func, *args, size=0):
+        # Счётчик меняется только из цикла событий, блокировка не нужна
+        if self.pending >= self.max_pending:
+            raise ExecutorBusy("Очередь задач кодирования переполнена")
+        pool = self.get_pool(size)  # до учёта в pending: если пул не создался, счётчик не утекает
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if not metrics.ENABLED:
+                return await loop.run_in_executor(pool, func, *args)
+            result, samples = await loop.run_in_executor(pool, metrics.collect, func, *args)
+            metrics.record(samples)
+            return result
+        except BrokenProcessPool:
+            self.drop_process_pool(pool)
+            raise WorkerLost("Процесс пула кодирования завершился аварийно")
+        finally:
+            self.pending -= 1
+
+    async def map(self, func, items, *args, size=0):
+        # Пакет делится на куски по числу воркеров: одна задача пула на кусок,
+        # а не на элемент, чтобы не платить за пересылку каждого сообщения.
+        # Весь пакет занимает в очереди одно место
+        if self.pending >= self.max_pending:
+            raise ExecutorBusy("Очередь задач кодирования переполнена")
+        if not items:
+            return []
+        pool = self.get_pool(size)
+        self.pending += 1
+        try:
+            workers = self.process_workers if isinstance(pool, ProcessPoolExecutor) else self.thread_workers
+            chunk_size = -(-len(items) // max(workers * 4, 1))
+            chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+            loop = asyncio.get_running_loop()
+            if metrics.ENABLED:
+                collected = await asyncio.gather(*[loop.run_in_executor(pool, metrics.collect, func, chunk, *args)
+                                                   for chunk in chunks])
+                results = []
+                for result, samples in collected:
+                    metrics.record(samples)
+                    results.append(result)
+            else:
+                results = await asyncio.gather(*[loop.run_in_executor(pool, func, chunk, *args) for chunk in chunks])
+            return [item for chunk in results for item in chunk]
+        except BrokenProcessPool:
+            self.drop_process_pool(pool)
+            raise WorkerLost("Процесс пула кодирования завершился аварийно")
+        finally:
+            self.pending -= 1
+
+    def drop_process_pool(self, pool):
+        # Сломанный пул больше не принимает задач: убираем его, get_pool создаст новый.
+        # Параллельные задачи того же пула могли уже заменить его - тогда не трогаем
+        if self.process_pool is pool:
+            self.process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
+            self.process_pool = None
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(cancel_futures=True)
+            self.thread_pool = None
@@ -0,0 +1,113 @@
+# Частотный анализ для построения дерева: частоты кусков текста считаются
+# в numpy над буфером UTF-32, а не по символу в Python. Итог хранится в Counter,
+# символы в котором идут в порядке первого появления в тексте, поэтому
+# most_common при равных частотах даёт тот же порядок, что Counter(text).
+# Гистограммы кусков и воркеров складываются через merge по порядку текста
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # без numpy считаем через Counter
+    np = None
+
+CHUNK_SIZE = 256 * 1024  # символов на один проход numpy
+SMALL_TEXT = 2048  # короче - сразу Counter: numpy не окупает подготовку
+FIRST_BLOCK = 1024  # с такого префикса начинается поиск первых вхождений
+
+
+class Histogram:
+    def __init__(self):
+        self.counter = Counter()
+
+    def update(self, text):
+        if np is None or len(text) < SMALL_TEXT:
+            self.counter.update(text)
+            return self
+        # Большой текст считается кусками: буфер UTF-32 вчетверо больше текста
+        # и целиком не помещается в кэш процессора
+        for start in range(0, len(text), CHUNK_SIZE):
+            chunk = text[start:start + CHUNK_SIZE].encode('utf-32-le', 'surrogatepass')
+            self.add_values(np.frombuffer(chunk, dtype=np.uint32))
+        return self
+
+    def update_bytes(self, data):
+        # Байтовый режим: байт b считается символом chr(b)
+        if np is None:
+            data = bytes(data)
+            values = [value for value in range(256) if bytes((value,)) in data]
+            values.sort(key=lambda value: data.find(bytes((value,))))
+            for value in values:
+                self.counter[chr(value)] += data.count(bytes((value,)))
+        elif len(data):
+            for start in range(0, len(data), CHUNK_SIZE):
+                self.add_values(np.frombuffer(data, dtype=np.uint8, count=min(CHUNK_SIZE, len(data) - start),
+                                              offset=start))
+        return self
+
+    def add_values(self, values):
+        # Частоты одного куска кодовых точек. bincount - только при плотном
+        # диапазоне номеров: один эмодзи иначе дал бы массив на сотни тысяч ячеек
+        top = int(values.max())
+        if top < 256 or top < 4 * len(values):
+            counts = np.bincount(values)
+            symbols = np.flatnonzero(counts)
+            counts = counts[symbols]
+        else:
+            symbols, counts = np.unique(values, return_counts=True)
+
+        counter = self.counter
+        symbols = list(map(chr, symbols.tolist()))
+        new = [symbol for symbol in symbols if symbol not in counter]
+        if new:
+            # Новые символы заносятся в порядке первого появления в куске
+            first = first_positions(values, [ord(symbol) for symbol in new])
+            new.sort(key=lambda symbol: first[ord(symbol)])
+            for symbol in new:
+                counter[symbol] = 0
+        for symbol, count in zip(symbols, counts.tolist()):
+            counter[symbol] += count
+
+    def merge(self, other):
+        # other - следующий по тексту кусок: его новые символы встают в конец
+        self.counter.update(other.counter)
+        return self
+
+    def most_common(self):
+        # По убыванию частоты, при равных частотах - по первому появлению в тексте
+        return self.counter.most_common()
+
+
+def first_positions(values, symbols):
+    # Позиции первых вхождений symbols в values. Обычно все символы встречаются
+    # в самом начале, поэтому сортируются только всё более длинные префиксы
+    pending = set(symbols)
+    found = {}
+    start = 0
+    size = FIRST_BLOCK
+    while pending and start < len(values):
+        block, index = np.unique(values[start:start + size], return_index=True)
+        for value, position in zip(block.tolist(), index.tolist()):
+            if value in pending:
+                pending.discard(value)
+                found[value] = start + position
+        start += size
+        size *= 4
+    return found
+
+
+def merge_histograms(histograms):
+    total = Histogram()
+    for histogram in histograms:
+        total.merge(histogram)
+    return total
+
+
+def byte_frequency(data):
+    # Частоты байтов для байтового режима кодека
+    frequency = Histogram().update_bytes(data).most_common()
+    if len(frequency) == 1:
+        # Единственный байт получил бы пустой код и потерялся бы при декодировании:
+        # второй символ с нулевой частотой даёт ему код длины 1
+        value = ord(frequency[0][0])
+        frequency.append((chr(value ^ 1), 0))
+    return frequency
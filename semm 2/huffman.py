@@ -0,0 +1,411 @@
+# Общее ядро кодека: дерево и коды Хаффмана, упаковка битов, табличный
+# декодер и XOR. Не зависит от FastAPI и pydantic, поэтому его использует и Shifrovanie.py
+import heapq
+
+try:
+    import numpy as np
+except ImportError:  # numpy необязателен, без него XOR делается через большие целые
+    np = None
+
+
+def xor_bytes(data, key_bytes, offset=0):
+    # XOR всего буфера за раз: ключ размножается до длины данных.
+    # offset - позиция data в общем потоке, чтобы ключ продолжался между кусками
+    size = len(data)
+    if size == 0:
+        return b''
+    shift = offset % len(key_bytes)
+    key_bytes = key_bytes[shift:] + key_bytes[:shift]
+    keystream = (key_bytes * (size // len(key_bytes) + 1))[:size]
+
+    if np is not None:
+        return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8),
+                              np.frombuffer(keystream, dtype=np.uint8)).tobytes()
+
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(size, 'big')
+
+
+# Escape-символ обученных кодовых книг: после его кода идёт номер
+# символа Unicode в ESCAPE_BITS битах. Пустая строка не совпадает ни с одним символом текста
+ESCAPE = ""
+ESCAPE_BITS = 21
+
+# Предел длины кода в присланных кодовых книгах и в ограничении max_code_length.
+# Коды Хаффмана по частотам любого реального текста намного короче; длиннее -
+# заведомо испорченный заголовок
+MAX_CODE_LENGTH = 64
+
+
+class CodeLengthError(ValueError):
+    # Ограничение длины кода невыполнимо для алфавита текста - ошибка запроса
+    pass
+
+
+class Node:
+    def __init__(self, symbol, frequency):
+        self.symbol = symbol
+        self.frequency = frequency
+        self.left = None
+        self.right = None
+
+    def __lt__(self, other):
+        return self.frequency < other.frequency
+
+
+def build_tree(frequency):
+    # frequency - пары (символ, частота); дерево строится на куче за O(k log k)
+    heap = [Node(symbol, freq) for symbol, freq in frequency]
+    heapq.heapify(heap)
+
+    while len(heap) > 1:
+        left = heapq.heappop(heap)
+        right = heapq.heappop(heap)
+        merged = Node(None, left.frequency + right.frequency)
+        merged.left = left
+        merged.right = right
+        heapq.heappush(heap, merged)
+
+    return heap[0]
+
+
+def generate_codes(node, prefix=""):
+    # Обход без рекурсии, чтобы длинные коды не упирались в предел стека.
+    # Порядок как у рекурсивного обхода: сначала левое поддерево.
+    # Пустые ветви в стек не кладутся: у листьев их половина от всех узлов
+    codebook = {}
+    stack = [(node, prefix)] if node is not None else []
+    while stack:
+        node, prefix = stack.pop()
+        if node.symbol is not None:
+            codebook[node.symbol] = prefix
+        if node.right is not None:
+            stack.append((node.right, prefix + "1"))
+        if node.left is not None:
+            stack.append((node.left, prefix + "0"))
+    return codebook
+
+
+def generate_code_lengths(node):
+    lengths = {}
+    stack = [(node, 0)] if node is not None else []
+    while stack:
+        node, depth = stack.pop()
+        if node.symbol is not None:
+            lengths[node.symbol] = depth
+        if node.right is not None:
+            stack.append((node.right, depth + 1))
+        if node.left is not None:
+            stack.append((node.left, depth + 1))
+    return lengths
+
+
+def limited_code_lengths(frequency, max_length):
+    # Длины кодов не больше max_length по алгоритму package-merge.
+    # Элемент списка - (вес, номер листа, пара объединённых элементов)
+    symbols = sorted(frequency, key=lambda item: item[1])
+    count = len(symbols)
+    if count == 1:
+        return {symbols[0][0]: 0}
+    if max_length < 1 or (1 << max_length) < count:
+        raise CodeLengthError(f"Длины кода {max_length} бит не хватает для {count} символов: "
+                              f"нужно не меньше {(count - 1).bit_length()}.")
+
+    leaves = [(freq, index, None) for index, (_, freq) in enumerate(symbols)]
+    current = leaves
+    for _ in range(max_length - 1):
+        packages = [(current[i][0] + current[i + 1][0], -1, (current[i], current[i + 1]))
+                    for i in range(0, len(current) - 1, 2)]
+        current = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+
+    # Длина кода символа - сколько раз его лист входит в первые 2n-2 элементов
+    lengths = [0] * count
+    stack = current[:2 * count - 2]
+    while stack:
+        _, index, children = stack.pop()
+        if children is None:
+            lengths[index] += 1
+        else:
+            stack.extend(children)
+    return {symbols[index][0]: lengths[index] for index in range(count)}
+
+
+def canonical_code_table(lengths):
+    # Символы упорядочиваются по (длина, символ), коды назначаются подряд
+    table = {}
+    code = 0
+    previous_length = 0
+    for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        code <<= length - previous_length
+        table[symbol] = (code, length)
+        code += 1
+        previous_length = length
+    return table
+
+
+def group_code_lengths(lengths):
+    # Компактная запись длин: длина кода -> символы этой длины по порядку
+    groups = {}
+    for symbol in sorted(lengths):
+        groups.setdefault(lengths[symbol], []).append(symbol)
+    return {length: ''.join(symbols) for length, symbols in sorted(groups.items())}
+
+
+def ungroup_code_lengths(code_lengths):
+    return {symbol: int(length) for length, symbols in code_lengths.items() for symbol in symbols}
+
+
+def build_code_table(codebook):
+    # символ -> (код как число, длина кода)
+    return {symbol: (int(code, 2) if code else 0, len(code))
+            for symbol, code in codebook.items()}
+
+
+def table_to_codebook(table):
+    # Обратно к словарю символ -> строка из '0' и '1'
+    return {symbol: format(code, f'0{length}b') if length else ''
+            for symbol, (code, length) in table.items()}
+
+
+# Байтовый режим: алфавит - 256 значений байта, байт b кодируется как символ chr(b).
+# Так таблицы, заголовки и декодер остаются общими с текстовым режимом,
+# а результат декодирования переводится обратно в байты через latin-1
+BYTE_ENCODING = 'latin-1'
+
+
+def byte_code_table(table):
+    # Таблица-массив на 256 элементов: BitWriter берёт код по значению байта без хэширования
+    return [table.get(chr(value)) for value in range(256)]
+
+
+def encode_bytes(text, table):
+    writer = BitWriter(table)
+    output = writer.write(text)
+    tail, padding = writer.flush()
+    output += tail
+    return output, padding
+
+
+class BitWriter:
+    # Пишет коды сразу в байты через битовый аккумулятор, без промежуточной
+    # строки из '0' и '1'. Между вызовами write хранит неполный последний байт
+    def __init__(self, code_table):
+        self.table = code_table
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, text):
+        table = self.table
+        output = bytearray()
+        acc = self.acc
+        nbits = self.nbits
+        for symbol in text:
+            try:
+                code, length = table[symbol]
+            except KeyError:
+                # Символа нет в обученной кодовой книге: escape-код и номер символа
+                if ESCAPE not in table:
+                    raise
+                code, length = table[ESCAPE]
+                code = (code << ESCAPE_BITS) | ord(symbol)
+                length += ESCAPE_BITS
+            acc = (acc << length) | code
+            nbits += length
+            if nbits >= 64:
+                rest = nbits & 7
+                output += (acc >> rest).to_bytes((nbits - rest) >> 3, 'big')
+                acc &= (1 << rest) - 1
+                nbits = rest
+
+        # Сбрасываем все целые байты, в аккумуляторе остаётся меньше 8 бит
+        rest = nbits & 7
+        if nbits > rest:
+            output += (acc >> rest).to_bytes((nbits - rest) >> 3, 'big')
+            acc &= (1 << rest) - 1
+            nbits = rest
+        self.acc = acc
+        self.nbits = nbits
+        return output
+
+    def flush(self):
+        padding = (8 - self.nbits % 8) % 8
+        output = bytearray()
+        if self.nbits:
+            output += (self.acc << padding).to_bytes(1, 'big')
+        self.acc = 0
+        self.nbits = 0
+        return output, padding
+
+
+class DecodeTables:
+    # Таблицы для табличного декодера: вместо обхода дерева по одному биту
+    # берём сразу primary_bits битов и получаем все символы, чьи коды в них
+    # целиком поместились. Коды длиннее индекса уходят во вторичные таблицы
+    # не шире SUB_BITS битов на уровень и не шире, чем нужно их группе кодов,
+    # поэтому память растёт с числом и длиной кодов, а не как 2 в степени
+    # длины самого длинного кода из присланной книги.
+    # После построения не меняются, поэтому их можно кэшировать и делить между потоками
+    PRIMARY_BITS = 12
+    SUB_BITS = 8
+
+    def __init__(self, code_table, primary_bits=PRIMARY_BITS):
+        self.max_length = max((length for _, length in code_table.values()), default=0)
+        if self.max_length > MAX_CODE_LENGTH:
+            raise ValueError(f"Слишком длинный код: {self.max_length} бит, допускается до {MAX_CODE_LENGTH}.")
+        self.primary_bits = min(self.max_length, primary_bits)
+        self.escape = ESCAPE in code_table
+        self.symbols, self.lengths = self.build_level(
+            [(symbol, code, length) for symbol, (code, length) in code_table.items()], 0, self.primary_bits)
+        self.runs, self.run_lengths = self.build_runs()
+
+    def build_level(self, codes, used, bits):
+        # Таблица на 2^bits индексов по битам кода после первых used
+        size = 1 << bits
+        symbols = [None] * size
+        lengths = [0] * size
+        long_codes = {}
+
+        for symbol, code, length in codes:
+            rest = length - used
+            if rest <= bits:
+                # Код короче индекса: заполняем все его продолжения
+                start = (code & ((1 << rest) - 1)) << (bits - rest)
+                for index in range(start, start + (1 << (bits - rest))):
+                    symbols[index] = symbol
+                    lengths[index] = length
+            else:
+                prefix = (code >> (rest - bits)) & (size - 1)
+                long_codes.setdefault(prefix, []).append((symbol, code, length))
+
+        for prefix, group in long_codes.items():
+            sub_bits = min(self.SUB_BITS, max(length for _, _, length in group) - used - bits,
+                           len(group).bit_length() + 1)
+            # Длина 0 при непустом символе означает ссылку на таблицу следующего уровня
+            symbols[prefix] = (sub_bits,) + self.build_level(group, used + bits, sub_bits)
+            lengths[prefix] = 0
+
+        return symbols, lengths
+
+    def build_runs(self):
+        # Для каждого индекса заранее декодируем все коды, целиком
+        # лежащие в его битах: один поиск выдаёт сразу несколько символов
+        bits = self.primary_bits
+        runs = []
+        run_lengths = []
+        for index in range(1 << bits):
+            used = 0
+            run = []
+            while True:
+                rest = bits - used
+                if rest == 0:
+                    break
+                sub_index = (index << used) & ((1 << bits) - 1)
+                length = self.lengths[sub_index]
+                symbol = self.symbols[sub_index]
+                if length == 0 or length > rest or symbol == ESCAPE:
+                    break
+                run.append(symbol)
+                used += length
+            runs.append(''.join(run))
+            run_lengths.append(used)
+        return runs, run_lengths
+
+
+class TableDecoder:
+    # Состояние декодирования одного потока поверх общих DecodeTables
+    def __init__(self, tables):
+        self.tables = tables
+        self.acc = 0
+        self.nbits = 0
+
+    def decode(self, data, padding):
+        return self.feed(data) + self.finish(padding)
+
+    def feed(self, data):
+        # Последний байт не трогаем: в нём может оказаться паддинг,
+        # длина которого становится известна только в finish
+        return self._run(data, 8)
+
+    def finish(self, padding):
+        text = self._run(b'', padding)
+        self.acc = 0
+        self.nbits = 0
+        return text
+
+    def _run(self, data, reserve):
+        tables = self.tables
+        if tables.max_length == 0:
+            return ''
+
+        runs = tables.runs
+        run_lengths = tables.run_lengths
+        bits = tables.primary_bits
+        mask = (1 << bits) - 1
+        need = tables.max_length + reserve
+        if tables.escape:
+            need += ESCAPE_BITS
+        acc = self.acc
+        nbits = self.nbits
+        pos = 0
+        size = len(data)
+        output = []
+
+        while True:
+            if nbits < need:
+                if pos >= size:
+                    break
+                chunk = data[pos:pos + 32]
+                pos += len(chunk)
+                acc = ((acc & ((1 << nbits) - 1)) << (len(chunk) << 3)) | int.from_bytes(chunk, 'big')
+                nbits += len(chunk) << 3
+                continue
+
+            index = (acc >> (nbits - bits)) & mask
+            length = run_lengths[index]
+            if length:
+                output.append(runs[index])
+                nbits -= length
+            else:
+                symbol, length = self._lookup(acc, nbits)
+                if symbol is None:
+                    raise ValueError("Ошибка декодирования: достигнут конец дерева.")
+                output.append(symbol)
+                nbits -= length
+
+        # Хвост, где битов меньше, чем самый длинный код: по одному символу
+        acc &= (1 << nbits) - 1
+        while nbits > reserve:
+            available = nbits - reserve
+            symbol, length = self._lookup(acc, nbits)
+            if symbol is None or length > available:
+                # Неполный код в конце, как и при обходе дерева, отбрасываем
+                break
+            output.append(symbol)
+            nbits -= length
+            acc &= (1 << nbits) - 1
+
+        self.acc = acc
+        self.nbits = nbits
+        return ''.join(output)
+
+    def _lookup(self, acc, nbits):
+        tables = self.tables
+        bits = tables.primary_bits
+        shift = nbits - bits
+        index = (acc >> shift if shift >= 0 else acc << -shift) & ((1 << bits) - 1)
+        symbol = tables.symbols[index]
+        length = tables.lengths[index]
+
+        while length == 0 and symbol is not None:
+            sub_bits, sub_symbols, sub_lengths = symbol
+            shift -= sub_bits
+            sub_index = (acc >> shift if shift >= 0 else acc << -shift) & ((1 << sub_bits) - 1)
+            symbol = sub_symbols[sub_index]
+            length = sub_lengths[sub_index]
+
+        if symbol == ESCAPE:
+            shift = nbits - length - ESCAPE_BITS
+            code_point = (acc >> shift if shift >= 0 else acc << -shift) & ((1 << ESCAPE_BITS) - 1)
+            length += ESCAPE_BITS
+            symbol = chr(code_point) if code_point <= 0x10FFFF else None
+
+        return symbol, length
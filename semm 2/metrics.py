@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+
+# Метрики в текстовом формате Prometheus для /metrics. При METRICS_ENABLED=0
+# stage() возвращает общий пустой контекст, middleware и события БД не
+# подключаются, поэтому в горячем пути остаётся только проверка флага
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+_NULL = nullcontext()
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}  # значения меток -> [счётчики корзин..., сумма, количество]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((key, list(series)) for key, series in self.series.items())
+        for label_values, series in items:
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = format_labels(self.labels + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = format_labels(self.labels + ("le",), label_values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{bucket_labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), callback=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.callback = callback  # значение без меток, читается в момент запроса /metrics
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values):
+        self.inc(*label_values, amount=-1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        if self.callback is not None:
+            lines.append(f"{self.name} {self.callback()}")
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Counter(Gauge):
+    # Тот же Gauge, который только растёт
+    type = "counter"
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+STAGE_SECONDS = Histogram("app_stage_seconds", "Время этапов: подсчёт частот, дерево, кодирование, XOR, hex, JWT",
+                          ("stage",), TIME_BUCKETS)
+REQUEST_SECONDS = Histogram("http_request_seconds", "Время обработки запроса",
+                            ("method", "path", "status"), TIME_BUCKETS)
+REQUEST_BYTES = Histogram("http_request_bytes", "Размер тела запроса", ("path",), SIZE_BUCKETS)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Запросы в обработке", ("path",))
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Время запросов к базе данных", ("operation",), TIME_BUCKETS)
+CACHE_LOOKUPS = Counter("app_cache_lookups_total", "Обращения к кэшам таблиц кодов и кодовых книг",
+                        ("cache", "result"))
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, REQUEST_BYTES, IN_FLIGHT, DB_QUERY_SECONDS, CACHE_LOOKUPS]
+
+
+class Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        samples = getattr(_local, "samples", None)
+        if samples is not None:
+            # Внутри задачи пула: замеры вернутся в основной процесс вместе с результатом
+            samples.append((self.name, elapsed))
+        else:
+            STAGE_SECONDS.observe(elapsed, self.name)
+
+
+def stage(name):
+    if not ENABLED:
+        return _NULL
+    return Stage(name)
+
+
+def cache_lookup(cache, hit):
+    # У каждого процесса пула свои кэши: события возвращаются так же, как замеры этапов
+    if not ENABLED:
+        return
+    result = "hit" if hit else "miss"
+    lookups = getattr(_local, "lookups", None)
+    if lookups is not None:
+        lookups.append((cache, result))
+    else:
+        CACHE_LOOKUPS.inc(cache, result)
+
+
+def collect(func, *args):
+    # Обёртка для задач CodingExecutor: в пуле процессов метрики основного
+    # процесса недоступны, поэтому замеры этапов и обращения к кэшам
+    # собираются и возвращаются вместе с результатом
+    _local.samples = []
+    _local.lookups = []
+    try:
+        result = func(*args)
+        return result, (_local.samples, _local.lookups)
+    finally:
+        _local.samples = None
+        _local.lookups = None
+
+
+def record(samples):
+    stages, lookups = samples
+    for name, elapsed in stages:
+        STAGE_SECONDS.observe(elapsed, name)
+    for cache, result in lookups:
+        CACHE_LOOKUPS.inc(cache, result)
+
+
+def add_gauge(name, help, callback):
+    REGISTRY.append(Gauge(name, help, callback=callback))
+
+
+def instrument_engine(engine):
+    # Время каждого SQL-запроса по событиям SQLAlchemy, метка - тип запроса
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        DB_QUERY_SECONDS.observe(elapsed, operation)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
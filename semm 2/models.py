@@ -1,3 +1,4 @@
+from sqlalchemy import JSON
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session
 
 
@@ -8,6 +9,15 @@ class UserModel(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    email: Mapped[str]
+    email: Mapped[str] = mapped_column(unique=True, index=True)
     password: Mapped[str]
 
+
+class CodebookModel(Base):
+    __tablename__ = "codebooks"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(unique=True)
+    code_lengths: Mapped[dict] = mapped_column(JSON)  # длина кода -> символы, как в EncodeResponse
+    escape_length: Mapped[int]
+
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.huffman import MAX_CODE_LENGTH
 
 
 class UserEmPasSchema(BaseModel):
@@ -9,9 +11,18 @@ class UserEmPasSchema(BaseModel):
 class Data(BaseModel):
     text: str
     key: str
+    canonical: bool = False  # вернуть длины канонических кодов вместо словаря кодов
+    max_code_length: int | None = Field(None, ge=1, le=MAX_CODE_LENGTH)  # ограничение длины кода в битах (package-merge)
 
 class EncodeResponse(BaseModel):
     encoded_data: str
     key: str
-    huffman_codes: dict
+    huffman_codes: dict | None = None
+    code_lengths: dict[int, str] | None = None  # длина кода -> символы в каноническом порядке
+    model: int | None = None  # id обученной кодовой книги, если кодировали по ней
+    extra_bits: int | None = None  # сколько бит стоило ограничение длины кода
     padding: int
+
+class CodebookSchema(BaseModel):
+    name: str
+    sample: str  # образец текста, по которому считаются частоты
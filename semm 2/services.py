@@ -1,77 +1,333 @@
-from collections import Counter
-import heapq
+from collections import OrderedDict
+import hashlib
+import json
+import threading
 
+from app import huffman, metrics
+from app.huffman import xor_bytes, ESCAPE, Node, BitWriter, DecodeTables, TableDecoder
+from app.frequency import Histogram, byte_frequency
 from app.schemas import EncodeResponse
+from app.wire import pack_frame, unpack_frame, pack_blocks, unpack_blocks, unpack_block
 
-class Node:
-    def __init__(self, symbol, frequency):
-        self.symbol = symbol
-        self.frequency = frequency
-        self.left = None
-        self.right = None
 
-    def __lt__(self, other):
-        return self.frequency < other.frequency
+class LRUCache:
+    # Ограниченный потокобезопасный LRU-кэш. Попадания и промахи кэша с именем
+    # name считаются в app_cache_lookups_total на /metrics
+    def __init__(self, max_size, name=None):
+        self.max_size = max_size
+        self.name = name
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+        if self.name is not None:
+            metrics.cache_lookup(self.name, value is not None)
+        return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            # Значение строим вне блокировки, чтобы не задерживать другие потоки
+            value = factory()
+            self.put(key, value)
+        return value
+
+
+def codebook_fingerprint(huffman_codes=None, code_lengths=None):
+    # Устойчивый хэш кодов: одинаковые кодовые книги дают один ключ кэша
+    if code_lengths is not None:
+        payload = {"code_lengths": {str(length): symbols for length, symbols in code_lengths.items()}}
+    else:
+        payload = {"huffman_codes": huffman_codes}
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    # surrogatepass: таблица кадра читается json.loads, а он пропускает одиночные суррогаты
+    return hashlib.sha256(data.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+# Кэш построенных таблиц декодирования (в каждом процессе пула свой)
+DECODE_CACHE_SIZE = 128
+decode_cache = LRUCache(DECODE_CACHE_SIZE, "decode_tables")
+
+# Кэш таблиц кодов обученных кодовых книг по их id
+MODEL_CACHE_SIZE = 64
+model_cache = LRUCache(MODEL_CACHE_SIZE, "model_tables")
+
+
+BLOCK_SIZE = 1024 * 1024  # символов в блоке по умолчанию
+
+# Короткие сообщения со своими кодами декодируются обходом дерева: построить
+# таблицы для новой кодовой книги дороже, чем пройти такое сообщение по битам.
+# Путь выбирается до обращения к кэшу, в кэш попадают только полные таблицы
+TREE_WALK_BITS = 1024
 
 
 class Coding:
     def __init__(self):
         self.codebook = {}
 
-    def compress_and_encrypt(self, model):
-        text = model.text
-        key = model.key
-        frequency = Counter(text).most_common()
-        huffman_tree = self.build_tree(frequency)
-        self.codebook = self.generate_codes(huffman_tree)
-        encoded_text = self.encode(text)
-
-        padding = (8 - len(encoded_text) % 8) % 8
-        if padding > 0:
-            encoded_text += '0' * padding
-
-        encoded_data = self.xor_encrypt(encoded_text, key)
-
-        return EncodeResponse(encoded_data=encoded_data,
-                              key=key,
-                              huffman_codes=self.codebook,
-                              padding=padding)
-
-    def decrypt_and_decompress(self, model):
-        encoded_data = model.encoded_data
-        key = model.key
-        self.codebook = model.huffman_codes
-        padding = model.padding
-        encoded_text = self.xor_decrypt(encoded_data, key, padding)
-        huffman_tree = self.build_tree_from_codebook()
-        decoded_text = self.decode(encoded_text, huffman_tree)
+    def compress_and_encrypt(self, model, codebook=None):
+        ciphertext, header = self.compress(model.text, model.key, model.canonical, codebook,
+                                           model.max_code_length)
+        with metrics.stage("hex"):
+            encoded_data = ciphertext.hex()
+        return EncodeResponse(encoded_data=encoded_data, key=model.key, **header)
+
+    def decrypt_and_decompress(self, model, codebook=None):
+        with metrics.stage("unhex"):
+            encrypted_bytes = bytes.fromhex(model.encoded_data)
+        decoded_text = self.decompress(encrypted_bytes, model.key, model.padding,
+                                       model.huffman_codes, model.code_lengths, codebook)
         return {"decoded_text": decoded_text}
 
-    def build_tree(self, frequency):
-        heap = [Node(symbol, freq) for symbol, freq in frequency]
-        heapq.heapify(heap)
+    def compress(self, text, key, canonical=False, codebook=None, max_code_length=None):
+        # Возвращает зашифрованные байты и заголовок: коды (или длины
+        # канонических кодов, или id обученной кодовой книги) и паддинг
+        if codebook is not None:
+            with metrics.stage("tree"):
+                self.code_table = self.model_code_table(codebook)
+            with metrics.stage("encode"):
+                encoded_bytes, padding = self.encode_bytes(text, self.code_table)
+            header = {"model": codebook["id"], "padding": padding}
+        else:
+            with metrics.stage("count"):
+                frequency = Histogram().update(text).most_common()
+            with metrics.stage("tree"):
+                header = self.prepare_codes(frequency, canonical, max_code_length)
+            with metrics.stage("encode"):
+                encoded_bytes, padding = self.encode_bytes(text, self.code_table)
+        with metrics.stage("xor"):
+            return xor_bytes(encoded_bytes, key.encode()), header
+
+    def decompress(self, encrypted_bytes, key, padding, huffman_codes=None, code_lengths=None,
+                   codebook=None):
+        if codebook is None and len(encrypted_bytes) * 8 <= TREE_WALK_BITS:
+            return self.decompress_short(encrypted_bytes, key, padding, huffman_codes, code_lengths)
+        with metrics.stage("decode_tables"):
+            decoder = self.build_decoder(huffman_codes, code_lengths, codebook)
+        with metrics.stage("xor"):
+            decrypted_bytes = xor_bytes(encrypted_bytes, key.encode())
+        with metrics.stage("decode"):
+            return decoder.decode(decrypted_bytes, padding)
+
+    def decompress_short(self, encrypted_bytes, key, padding, huffman_codes=None, code_lengths=None):
+        with metrics.stage("decode_tables"):
+            if code_lengths is not None:
+                self.codebook = huffman.table_to_codebook(self.decode_table(code_lengths=code_lengths))
+            elif huffman_codes is not None:
+                self.codebook = huffman_codes
+            else:
+                raise ValueError("Не переданы ни коды Хаффмана, ни длины кодов.")
+            huffman_tree = self.build_tree_from_codebook()
+        with metrics.stage("xor"):
+            decrypted_bytes = xor_bytes(encrypted_bytes, key.encode())
+        with metrics.stage("decode"):
+            bits = ''.join(f'{b:08b}' for b in decrypted_bytes)
+            return self.decode(bits[:len(bits) - padding], huffman_tree)
+
+    def compress_binary(self, data, key, canonical=False, max_code_length=None):
+        # Байтовый режим: алфавит из 256 значений байта, подходит для любых файлов.
+        # Кодирование идёт по таблице-массиву, без перевода данных в строку
+        if not data:
+            raise ValueError("Пустые данные.")
+        with metrics.stage("count"):
+            frequency = byte_frequency(data)
+        with metrics.stage("tree"):
+            header = self.prepare_codes(frequency, canonical, max_code_length)
+        with metrics.stage("encode"):
+            encoded_bytes, padding = self.encode_bytes(data, huffman.byte_code_table(self.code_table))
+        with metrics.stage("xor"):
+            return xor_bytes(encoded_bytes, key.encode()), header
+
+    def decompress_binary(self, encrypted_bytes, key, padding, huffman_codes=None, code_lengths=None):
+        text = self.decompress(encrypted_bytes, key, padding, huffman_codes, code_lengths)
+        return text.encode(huffman.BYTE_ENCODING)
 
-        while len(heap) > 1:
-            left = heapq.heappop(heap)
-            right = heapq.heappop(heap)
-            merged = Node(None, left.frequency + right.frequency)
-            merged.left = left
-            merged.right = right
-            heapq.heappush(heap, merged)
+    def compress_frame(self, text, key, canonical=False, codebook=None, max_code_length=None):
+        ciphertext, header = self.compress(text, key, canonical, codebook, max_code_length)
+        header.pop("extra_bits", None)  # в двоичный кадр не входит
+        return pack_frame(ciphertext, **header)
 
-        return heap[0]
+    def decompress_frame(self, data, key, codebook=None):
+        # Кадр байтового режима декодируется в bytes, текстовый - в str
+        fields = unpack_frame(data)
+        if fields["binary"]:
+            return self.decompress_binary(fields["ciphertext"], key, fields["padding"],
+                                          fields["huffman_codes"], fields["code_lengths"])
+        return self.decompress(fields["ciphertext"], key, fields["padding"],
+                               fields["huffman_codes"], fields["code_lengths"], codebook)
+
+    def split_blocks(self, text, block_size=BLOCK_SIZE):
+        return [text[i:i + block_size] for i in range(0, len(text), block_size)]
+
+    def compress_blocks(self, text, key, block_size=BLOCK_SIZE, canonical=False, codebook=None,
+                        max_code_length=None):
+        # Каждый блок - независимый кадр со своей таблицей и своим началом ключа.
+        # Здесь блоки идут по очереди, api и CLI раздают их по процессам
+        return pack_blocks(self.compress_frame(block, key, canonical, codebook, max_code_length)
+                           for block in self.split_blocks(text, block_size))
+
+    def decompress_blocks(self, data, key, block=None, codebook=None):
+        # block - номер блока: по индексу контейнера декодируется только он
+        if block is not None:
+            return self.decompress_frame(unpack_block(data, block), key, codebook)
+        return ''.join(self.decompress_frame(frame, key, codebook) for frame in unpack_blocks(data))
+
+    def train(self, sample):
+        # Обучение кодовой книги на образце текста. Escape-символ получает
+        # минимальную частоту и кодирует всё, чего не было в образце
+        frequency = Histogram().update(sample).most_common() + [(ESCAPE, 1)]
+        lengths = self.generate_code_lengths(self.build_tree(frequency))
+        escape_length = lengths.pop(ESCAPE)
+        return self.group_code_lengths(lengths), escape_length
+
+    def model_code_table(self, codebook):
+        # codebook - словарь с полями id, code_lengths и escape_length
+        def build():
+            lengths = self.ungroup_code_lengths(codebook["code_lengths"])
+            lengths[ESCAPE] = codebook["escape_length"]
+            return self.canonical_code_table(lengths)
+        return model_cache.get_or_create(codebook["id"], build)
+
+    def build_decoder(self, huffman_codes=None, code_lengths=None, codebook=None):
+        # Таблицы для уже встречавшихся кодов берутся из кэша
+        if codebook is not None:
+            tables = decode_cache.get_or_create(
+                ("model", codebook["id"]),
+                lambda: DecodeTables(self.model_code_table(codebook))
+            )
+            return TableDecoder(tables)
+
+        tables = decode_cache.get_or_create(
+            codebook_fingerprint(huffman_codes, code_lengths),
+            lambda: DecodeTables(self.decode_table(huffman_codes, code_lengths))
+        )
+        return TableDecoder(tables)
+
+    def decode_table(self, huffman_codes=None, code_lengths=None):
+        if code_lengths is not None:
+            return self.canonical_code_table(self.ungroup_code_lengths(code_lengths))
+        if huffman_codes is not None:
+            self.codebook = huffman_codes
+            return self.build_code_table()
+        raise ValueError("Не переданы ни коды Хаффмана, ни длины кодов.")
+
+    def prepare_codes(self, frequency, canonical=False, max_code_length=None):
+        # Коды строятся по заранее посчитанным частотам, поэтому паддинг
+        # известен до начала кодирования и его можно отдать в заголовке.
+        # Канонические коды однозначно восстанавливаются по длинам,
+        # поэтому вместо словаря кодов отдаются только длины
+        huffman_tree = self.build_tree(frequency)
+        lengths = None
+        extra_bits = 0
+        limited = False  # длины ограничены: коды дерева уже не годятся, даже если лишних бит 0
+        if max_code_length is not None:
+            lengths = self.generate_code_lengths(huffman_tree)
+            if max(lengths.values()) > max_code_length:
+                # Ограниченные длины уже не соответствуют дереву, коды назначаются канонически
+                limited = True
+                limited_lengths = self.limited_code_lengths(frequency, max_code_length)
+                extra_bits = (sum(freq * limited_lengths[symbol] for symbol, freq in frequency)
+                              - sum(freq * lengths[symbol] for symbol, freq in frequency))
+                lengths = limited_lengths
+                if not canonical:
+                    self.code_table = self.canonical_code_table(lengths)
+                    self.codebook = huffman.table_to_codebook(self.code_table)
+
+        if canonical:
+            if lengths is None:
+                lengths = self.generate_code_lengths(huffman_tree)
+            self.code_table = self.canonical_code_table(lengths)
+            header = {"code_lengths": self.group_code_lengths(lengths)}
+        elif limited:
+            header = {"huffman_codes": self.codebook}
+        else:
+            self.codebook = self.generate_codes(huffman_tree)
+            self.code_table = self.build_code_table()
+            header = {"huffman_codes": self.codebook}
+
+        if max_code_length is not None:
+            # Во сколько бит обошлось ограничение длины по сравнению с оптимальными кодами
+            header["extra_bits"] = extra_bits
+
+        total_bits = sum(freq * self.code_table[symbol][1] for symbol, freq in frequency)
+        header["padding"] = (8 - total_bits % 8) % 8
+        return header
+
+    def encode_stream(self, chunks, key):
+        # Кодирует и шифрует текст по кускам, не держа в памяти весь результат
+        writer = BitWriter(self.code_table)
+        key_bytes = key.encode()
+        offset = 0
+        for text in chunks:
+            data = writer.write(text)
+            if data:
+                yield xor_bytes(data, key_bytes, offset)
+                offset += len(data)
+        data, _ = writer.flush()
+        if data:
+            yield xor_bytes(data, key_bytes, offset)
+
+    def decode_stream(self, chunks, key, padding, huffman_codes=None, code_lengths=None):
+        # Таблица строится сразу, чтобы ошибка в кодах всплыла до начала ответа
+        decoder = self.build_decoder(huffman_codes, code_lengths)
+        return self._decode_chunks(decoder, chunks, key, padding)
+
+    def _decode_chunks(self, decoder, chunks, key, padding):
+        key_bytes = key.encode()
+        offset = 0
+        for data in chunks:
+            text = decoder.feed(xor_bytes(data, key_bytes, offset))
+            offset += len(data)
+            if text:
+                yield text.encode()
+        text = decoder.finish(padding)
+        if text:
+            yield text.encode()
+
+    def build_tree(self, frequency):
+        return huffman.build_tree(frequency)
 
     def generate_codes(self, node, prefix=""):
-        if node is not None:
-            if node.symbol is not None:
-                self.codebook[node.symbol] = prefix
-            self.generate_codes(node.left, prefix + "0")
-            self.generate_codes(node.right, prefix + "1")
+        self.codebook.update(huffman.generate_codes(node, prefix))
         return self.codebook
 
+    def generate_code_lengths(self, node):
+        return huffman.generate_code_lengths(node)
+
+    def limited_code_lengths(self, frequency, max_length):
+        return huffman.limited_code_lengths(frequency, max_length)
+
+    def canonical_code_table(self, lengths):
+        return huffman.canonical_code_table(lengths)
+
+    def group_code_lengths(self, lengths):
+        return huffman.group_code_lengths(lengths)
+
+    def ungroup_code_lengths(self, code_lengths):
+        return huffman.ungroup_code_lengths(code_lengths)
+
     def encode(self, text):
         return ''.join(self.codebook[symbol] for symbol in text)
 
+    def build_code_table(self):
+        return huffman.build_code_table(self.codebook)
+
+    def encode_bytes(self, text, table=None):
+        if table is None:
+            table = self.build_code_table()
+        return huffman.encode_bytes(text, table)
+
     def decode(self, encoded_text, huffman_tree):
         decoded_text = []
         current_node = huffman_tree
@@ -86,18 +342,20 @@ class Coding:
 
     def xor_encrypt(self, text, key):
         encoded_bytes = bytes([int(text[i:i+8], 2) for i in range(0, len(text), 8)])
-        key_bytes = key.encode()
-        encrypted_bytes = bytes(b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(encoded_bytes))
-        return encrypted_bytes.hex()
+        return self.xor_encrypt_bytes(encoded_bytes, key)
+
+    def xor_encrypt_bytes(self, data, key):
+        return xor_bytes(data, key.encode()).hex()
 
     def xor_decrypt(self, text, key, padding):
-        encrypted_bytes = bytes.fromhex(text)
-        key_bytes = key.encode()
-        decrypted_bytes = bytes(b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(encrypted_bytes))
+        decrypted_bytes = self.xor_decrypt_bytes(text, key)
         decoded_text = ''.join(f'{b:08b}' for b in decrypted_bytes)
         decoded_text = decoded_text[:len(decoded_text)-padding]
         return decoded_text
 
+    def xor_decrypt_bytes(self, text, key):
+        return xor_bytes(bytes.fromhex(text), key.encode())
+
     def build_tree_from_codebook(self):
         reverse_codebook = {v: k for k, v in self.codebook.items()}
         root = Node(None, 0)
@@ -116,3 +374,72 @@ class Coding:
             current_node.symbol = symbol
 
         return root
+
+
+# Функции верхнего уровня, чтобы задачи можно было отправить в пул процессов
+def compress_and_encrypt(model, codebook=None):
+    return Coding().compress_and_encrypt(model, codebook)
+
+
+def decrypt_and_decompress(model, codebook=None):
+    return Coding().decrypt_and_decompress(model, codebook)
+
+
+def compress_to_frame(model, codebook=None):
+    return Coding().compress_frame(model.text, model.key, model.canonical, codebook,
+                                   model.max_code_length)
+
+
+def decompress_frame(data, key, codebook=None):
+    return {"decoded_text": Coding().decompress_frame(data, key, codebook)}
+
+
+def compress_binary_to_frame(data, key, canonical=False, max_code_length=None):
+    ciphertext, header = Coding().compress_binary(data, key, canonical, max_code_length)
+    header.pop("extra_bits", None)
+    return pack_frame(ciphertext, binary=True, **header)
+
+
+def decompress_binary_frame(data, key):
+    return Coding().decompress_frame(data, key)
+
+
+def compress_blocks(blocks, key, canonical=False, codebook=None, max_code_length=None):
+    # Кусок блоков для CodingExecutor.map, возвращает их кадры в том же порядке
+    return [Coding().compress_frame(block, key, canonical, codebook, max_code_length) for block in blocks]
+
+
+def decompress_blocks(frames, key, codebook=None):
+    return [Coding().decompress_frame(frame, key, codebook) for frame in frames]
+
+
+def compress_batch(models, codebook=None):
+    # Ошибка в одном сообщении не мешает остальным: она возвращается на его месте
+    results = []
+    for model in models:
+        try:
+            response = Coding().compress_and_encrypt(model, codebook)
+            results.append({"result": response.model_dump(exclude_none=True)})
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def decompress_batch(models, codebooks):
+    # codebooks - обученные кодовые книги по id для сообщений с полем model
+    results = []
+    for model in models:
+        try:
+            codebook = None
+            if model.model is not None:
+                codebook = codebooks.get(model.model)
+                if codebook is None:
+                    raise ValueError("Кодовая книга не найдена")
+            results.append({"result": Coding().decrypt_and_decompress(model, codebook)})
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def train_codebook(sample):
+    return Coding().train(sample)
@@ -0,0 +1,45 @@
+import os
+import pathlib
+import sys
+import tempfile
+import types
+
+import pytest
+
+# Модули приложения импортируют друг друга как пакет app, а лежит он в каталоге
+# "semm 2". Если app не установлен, регистрируем этот каталог под именем app
+APP_DIR = pathlib.Path(__file__).resolve().parent.parent
+if "app" not in sys.modules:
+    package = types.ModuleType("app")
+    package.__path__ = [str(APP_DIR)]
+    sys.modules["app"] = package
+
+# Тестам - своя база во временном каталоге, до первого импорта app.cruds
+DATABASE_DIR = tempfile.mkdtemp(prefix="huffman-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DATABASE_DIR}/test.bd")
+
+
+@pytest.fixture(scope="session")
+def database():
+    import asyncio
+    from app.cruds import engine
+    from app.models import Base
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    # Пул движка привязан к циклу событий, в котором открывались соединения
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(database):
+    from fastapi.testclient import TestClient
+    from app.api import app
+    from app.core import security, config
+
+    with TestClient(app) as test_client:
+        test_client.cookies.set(config.JWT_ACCESS_COOKIE_NAME, security.create_access_token(uid="1"))
+        yield test_client
@@ -0,0 +1,28 @@
+from app.services import compress_batch, decompress_batch
+from app.schemas import Data, EncodeResponse
+
+TEXTS = ["первое", "second 😀", "третье сообщение", "xy"]
+
+
+def test_batch_functions_keep_order():
+    encoded = compress_batch([Data(text=text, key="k") for text in TEXTS])
+    decoded = decompress_batch([EncodeResponse(**item["result"]) for item in encoded], {})
+    assert [item["result"]["decoded_text"] for item in decoded] == TEXTS
+
+
+def test_batch_endpoints(client):
+    encoded = client.post("/encode/batch", json=[{"text": text, "key": "k"} for text in TEXTS])
+    assert encoded.status_code == 200
+    results = [item["result"] for item in encoded.json()]
+
+    # Ошибка в одном сообщении возвращается на его месте и не мешает остальным
+    broken = dict(results[1], encoded_data="zz")
+    unknown = dict(results[2], model=999999)
+    decoded = client.post("/decode/batch", json=[results[0], broken, unknown, results[3]]).json()
+    assert decoded[0] == {"result": {"decoded_text": TEXTS[0]}}
+    assert "error" in decoded[1] and "error" in decoded[2]
+    assert decoded[3] == {"result": {"decoded_text": TEXTS[3]}}
+
+
+def test_empty_batch(client):
+    assert client.post("/encode/batch", json=[]).json() == []
@@ -0,0 +1,29 @@
+import json
+
+from app.benchmarks import bench_suite
+
+
+def test_corpus_is_reproducible():
+    for distribution in bench_suite.DISTRIBUTIONS:
+        text = bench_suite.make_corpus(distribution, 500)
+        assert len(text) == 500
+        assert text == bench_suite.make_corpus(distribution, 500)
+
+
+def test_suite_smoke_run(tmp_path, capsys):
+    # Малые размеры: проверяется только, что прогон доходит до конца и пишет JSON
+    output = tmp_path / "results.json"
+    bench_suite.main(["--sizes", "2000", "--distributions", "zipf", "mixed", "--repeats", "1",
+                      "--http-sizes", "200", "--http-requests", "4", "--concurrency", "2",
+                      "--output", str(output)])
+    results = json.loads(output.read_text(encoding="utf-8"))
+    assert [item["distribution"] for item in results["codec"]] == ["zipf", "mixed"]
+    assert all(item["encode_mb_s"] > 0 and item["decode_mb_s"] > 0 for item in results["codec"])
+    assert len(results["shifrovanie"]) == 2
+    assert [item["endpoint"] for item in results["http"]] == ["/encode", "/decode"]
+    assert all(item["errors"] == 0 for item in results["http"])
+
+    # Сравнение с самим собой: все отношения равны 1
+    capsys.readouterr()
+    bench_suite.compare(results, results)
+    assert "1.00x" in capsys.readouterr().out
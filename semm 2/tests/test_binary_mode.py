@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app import Shifrovanie, frequency, wire
+from app.frequency import byte_frequency
+from app.services import compress_binary_to_frame, decompress_binary_frame
+
+rnd = random.Random(15)
+DATA = bytes(rnd.choices(range(256), weights=[(i % 17) + 1 for i in range(256)], k=20000))
+
+
+@pytest.mark.parametrize("data", [DATA, b"\x00", b"\xff" * 100, bytes(range(256))])
+@pytest.mark.parametrize("canonical", [False, True])
+def test_binary_round_trip(data, canonical):
+    frame = compress_binary_to_frame(data, "ключ", canonical)
+    assert wire.unpack_header(frame)[0]["binary"]
+    assert decompress_binary_frame(frame, "ключ") == data
+
+
+def test_limited_binary_round_trip():
+    frame = compress_binary_to_frame(DATA, "k", max_code_length=9)
+    assert decompress_binary_frame(frame, "k") == DATA
+
+
+def test_empty_data():
+    with pytest.raises(ValueError):
+        compress_binary_to_frame(b"", "k")
+
+
+def test_byte_frequency_without_numpy(monkeypatch):
+    expected = byte_frequency(DATA)
+    monkeypatch.setattr(frequency, "np", None)
+    assert byte_frequency(DATA) == expected
+    assert sum(count for _, count in expected) == len(DATA)
+
+
+def test_binary_endpoints(client):
+    encoded = client.post("/encode/binary", params={"canonical": True}, content=DATA,
+                          headers={"X-Key": "k", "Content-Type": "application/octet-stream"})
+    assert encoded.status_code == 200
+    assert encoded.headers["content-type"] == wire.MEDIA_TYPE
+
+    decoded = client.post("/decode", content=encoded.content, headers={"Content-Type": wire.MEDIA_TYPE, "X-Key": "k"})
+    assert decoded.content == DATA
+    missing_key = client.post("/decode", content=encoded.content, headers={"Content-Type": wire.MEDIA_TYPE})
+    assert missing_key.status_code == 400
+
+
+def test_cli_binary(tmp_path, monkeypatch):
+    monkeypatch.setenv(Shifrovanie.KEY_ENV, "k")
+    source = tmp_path / "input.bin"
+    source.write_bytes(DATA)
+    encoded = tmp_path / "output.huf"
+    assert Shifrovanie.run_cli(["encode", "--binary", "-i", str(source), "-o", str(encoded)]) == 0
+
+    decoded = tmp_path / "decoded.bin"
+    assert Shifrovanie.run_cli(["decode", "-i", str(encoded), "-o", str(decoded)]) == 0
+    assert decoded.read_bytes() == DATA
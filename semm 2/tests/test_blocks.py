@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from app import Shifrovanie, wire
+from app.services import Coding
+
+rnd = random.Random(14)
+TEXT = ''.join(rnd.choices("абвгд abc\n😀", k=50000))
+
+
+def test_blocks_round_trip_and_random_access():
+    data = Coding().compress_blocks(TEXT, "k", 7000, canonical=True)
+    assert len(wire.block_index(data)) == 8
+    assert Coding().decompress_blocks(data, "k") == TEXT
+    assert Coding().decompress_blocks(data, "k", 3) == TEXT[21000:28000]
+    with pytest.raises(ValueError):
+        Coding().decompress_blocks(data, "k", 8)
+
+
+def test_block_endpoints(client):
+    response = client.post("/encode", params={"block_size": 9000}, json={"text": TEXT, "key": "k"})
+    assert response.headers["content-type"] == wire.MEDIA_TYPE
+    headers = {"Content-Type": wire.MEDIA_TYPE, "X-Key": "k"}
+
+    decoded = client.post("/decode", content=response.content, headers=headers)
+    assert decoded.json() == {"decoded_text": TEXT}
+    decoded = client.post("/decode", params={"block": 5}, content=response.content, headers=headers)
+    assert decoded.json() == {"decoded_text": TEXT[45000:]}
+
+
+def test_file_blocks_do_not_split_characters():
+    data = "ё😀a".encode() * 1000
+    bounds = list(Shifrovanie.split_file_blocks(data, 5))
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(data)
+    for start, end in bounds:
+        data[start:end].decode("utf-8")
+
+
+def test_cli_blocks(tmp_path, monkeypatch):
+    monkeypatch.setenv(Shifrovanie.KEY_ENV, "k")
+    source = tmp_path / "input.txt"
+    source.write_text(TEXT, encoding="utf-8")
+    encoded = tmp_path / "blocks.huf"
+    assert Shifrovanie.run_cli(["encode", "--block-size", "10000", "-j", "2",
+                                "-i", str(source), "-o", str(encoded)]) == 0
+
+    decoded = tmp_path / "decoded.txt"
+    assert Shifrovanie.run_cli(["decode", "-j", "2", "-i", str(encoded), "-o", str(decoded)]) == 0
+    assert decoded.read_text(encoding="utf-8") == TEXT
+
+    first = tmp_path / "first.txt"
+    assert Shifrovanie.run_cli(["decode", "--block", "0", "-i", str(encoded), "-o", str(first)]) == 0
+    assert TEXT.encode().startswith(first.read_bytes())
@@ -0,0 +1,47 @@
+from app.frequency import Histogram
+from app.huffman import (build_tree, generate_code_lengths, canonical_code_table, table_to_codebook,
+                         group_code_lengths, ungroup_code_lengths)
+
+TEXT = "канонические коды Хаффмана: only lengths are shipped 😀" * 20
+
+
+def is_prefix_free(codes):
+    codes = sorted(codes)
+    return all(not b.startswith(a) for a, b in zip(codes, codes[1:]))
+
+
+def test_canonical_codes_keep_lengths():
+    lengths = generate_code_lengths(build_tree(Histogram().update(TEXT).most_common()))
+    codebook = table_to_codebook(canonical_code_table(lengths))
+    assert {symbol: len(code) for symbol, code in codebook.items()} == lengths
+    assert is_prefix_free(codebook.values())
+
+
+def test_canonical_codes_are_ordered():
+    # Внутри длины коды идут подряд в порядке символов, поэтому по длинам восстанавливаются однозначно
+    table = canonical_code_table({"e": 3, "b": 2, "c": 2, "a": 2, "d": 3})
+    assert table_to_codebook(table) == {"a": "00", "b": "01", "c": "10", "d": "110", "e": "111"}
+
+
+def test_group_code_lengths_round_trip():
+    lengths = generate_code_lengths(build_tree(Histogram().update(TEXT).most_common()))
+    grouped = group_code_lengths(lengths)
+    assert list(grouped) == sorted(grouped)
+    # Через JSON ключи-длины становятся строками
+    assert ungroup_code_lengths({str(length): symbols for length, symbols in grouped.items()}) == lengths
+
+
+def test_encode_canonical_response(client):
+    response = client.post("/encode", json={"text": TEXT, "key": "k", "canonical": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert "code_lengths" in body and "huffman_codes" not in body
+
+    decoded = client.post("/decode", json=body)
+    assert decoded.json() == {"decoded_text": TEXT}
+
+
+def test_canonical_response_is_smaller(client):
+    plain = client.post("/encode", json={"text": TEXT, "key": "k"}).json()
+    canonical = client.post("/encode", json={"text": TEXT, "key": "k", "canonical": True}).json()
+    assert len(str(canonical["code_lengths"])) < len(str(plain["huffman_codes"]))
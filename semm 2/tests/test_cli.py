@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from app import Shifrovanie, wire
+
+TEXT = "файловый режим: mmap на входе, куски на выходе 😀\n" * 2000
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_key_in_env(monkeypatch):
+    monkeypatch.delenv(Shifrovanie.KEY_ENV, raising=False)
+
+
+def test_round_trip_with_env_key(source, tmp_path, monkeypatch):
+    monkeypatch.setenv(Shifrovanie.KEY_ENV, "секрет")
+    monkeypatch.setattr(Shifrovanie, "CHUNK_SIZE", 1000)  # несколько кусков на каждом проходе
+    encoded = tmp_path / "output.huf"
+    assert Shifrovanie.run_cli(["encode", "-i", str(source), "-o", str(encoded)]) == 0
+    assert "секрет".encode() not in encoded.read_bytes()
+    assert "key" not in wire.read_header(io.BytesIO(encoded.read_bytes()))
+
+    decoded = tmp_path / "decoded.txt"
+    assert Shifrovanie.run_cli(["decode", "-i", str(encoded), "-o", str(decoded)]) == 0
+    assert decoded.read_text(encoding="utf-8") == TEXT
+
+
+def test_round_trip_with_key_file_and_stdin(source, tmp_path, monkeypatch):
+    key_file = tmp_path / "key"
+    key_file.write_text("ключ\n", encoding="utf-8")
+    encoded = tmp_path / "output.huf"
+    assert Shifrovanie.run_cli(["encode", "--key-file", str(key_file), "-i", str(source), "-o", str(encoded),
+                                "--max-code-length", "8"]) == 0
+
+    # Вход из файла: ключ можно подать в stdin
+    monkeypatch.setattr("sys.stdin", io.StringIO("ключ\n"))
+    decoded = tmp_path / "decoded.txt"
+    assert Shifrovanie.run_cli(["decode", "-i", str(encoded), "-o", str(decoded)]) == 0
+    assert decoded.read_text(encoding="utf-8") == TEXT
+
+
+def test_key_is_not_an_argument(source):
+    with pytest.raises(SystemExit):
+        Shifrovanie.run_cli(["encode", "-k", "ключ", "-i", str(source)])
+
+
+def test_missing_key_is_an_error(capsys):
+    # Данные идут через stdin, поэтому ключу остаются только файл и окружение
+    assert Shifrovanie.run_cli(["encode"]) == 1
+    assert Shifrovanie.KEY_ENV in capsys.readouterr().err
+
+
+def test_bad_max_code_length(source, monkeypatch):
+    monkeypatch.setenv(Shifrovanie.KEY_ENV, "k")
+    with pytest.raises(SystemExit):
+        Shifrovanie.run_cli(["encode", "--max-code-length", "0", "-i", str(source)])
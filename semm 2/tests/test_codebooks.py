@@ -0,0 +1,43 @@
+from app.schemas import Data
+from app.services import Coding
+
+SAMPLE = "обучающий образец текста для кодовой книги " * 20
+
+
+def trained(model_id=1000):
+    code_lengths, escape_length = Coding().train(SAMPLE)
+    return {"id": model_id, "code_lengths": code_lengths, "escape_length": escape_length}
+
+
+def test_train_covers_sample_and_escape():
+    codebook = trained()
+    symbols = ''.join(codebook["code_lengths"].values())
+    # Escape-символ не попадает в длины: его длина хранится отдельно
+    assert sorted(symbols) == sorted(set(SAMPLE))
+    assert codebook["escape_length"] >= max(codebook["code_lengths"])
+
+
+def test_model_round_trip_with_unseen_symbols():
+    codebook = trained(1001)
+    text = "образец с новыми символами: zZ 😀 \U0010FFFF"
+    response = Coding().compress_and_encrypt(Data(text=text, key="k"), codebook)
+    assert response.model == 1001
+    assert response.huffman_codes is None and response.code_lengths is None
+    assert Coding().decrypt_and_decompress(response, codebook) == {"decoded_text": text}
+
+
+def test_codebook_endpoints(client):
+    created = client.post("/codebooks", json={"name": "test-codebooks", "sample": SAMPLE})
+    assert created.status_code == 201
+    model = created.json()["id"]
+
+    text = "кодовая книга 😀"
+    encoded = client.post("/encode", params={"model": model}, json={"text": text, "key": "k"}).json()
+    assert encoded["model"] == model and "huffman_codes" not in encoded
+    assert client.post("/decode", json=encoded).json() == {"decoded_text": text}
+
+    duplicate = client.post("/codebooks", json={"name": "test-codebooks", "sample": SAMPLE})
+    assert duplicate.status_code == 400
+    missing = client.post("/encode", params={"model": 999999}, json={"text": text, "key": "k"})
+    assert missing.status_code == 404
+    assert client.post("/codebooks", json={"name": "empty", "sample": ""}).status_code == 400
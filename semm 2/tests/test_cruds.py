@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import cruds
+
+
+async def pragmas(engine, *names):
+    try:
+        async with engine.connect() as connection:
+            return [(await connection.execute(text(f"PRAGMA {name}"))).scalar() for name in names]
+    finally:
+        await engine.dispose()
+
+
+def test_write_engine_pragmas(database):
+    journal_mode, synchronous, busy_timeout, query_only = asyncio.run(pragmas(
+        cruds.engine, "journal_mode", "synchronous", "busy_timeout", "query_only"))
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == cruds.SQLITE_BUSY_TIMEOUT
+    assert query_only == 0
+
+
+def test_read_engine_is_query_only(database):
+    assert asyncio.run(pragmas(cruds.read_engine, "journal_mode", "query_only")) == ["wal", 1]
+
+    async def write():
+        try:
+            async with cruds.read_engine.begin() as connection:
+                await connection.execute(text("INSERT INTO users (email, password) VALUES ('r@x', 'p')"))
+        finally:
+            await cruds.read_engine.dispose()
+
+    with pytest.raises(OperationalError, match="readonly"):
+        asyncio.run(write())
+
+
+def test_concurrent_sign_ups_and_logins(database):
+    # Все записи идут через одно соединение и ждут в очереди пула, а не падают с "database is locked"
+    from app.api import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                users = [{"email": f"user{i}@cruds.test", "password": "p"} for i in range(20)]
+                created = await asyncio.gather(*[client.post("/sign-up/", json=user) for user in users])
+                logged_in = await asyncio.gather(*[client.post("/login/", json=user) for user in users])
+                return [r.status_code for r in created], [r.status_code for r in logged_in]
+        finally:
+            await cruds.engine.dispose()
+            await cruds.read_engine.dispose()
+
+    created, logged_in = asyncio.run(run())
+    assert created == [201] * 20
+    assert logged_in == [200] * 20
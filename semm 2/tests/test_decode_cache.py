@@ -0,0 +1,74 @@
+import pytest
+
+from app import metrics
+from app.services import Coding, LRUCache, codebook_fingerprint, decode_cache
+
+TEXT = "кэш таблиц декодирования " * 400
+
+
+@pytest.fixture
+def encoded():
+    decode_cache.items.clear()
+    ciphertext, header = Coding().compress(TEXT, "k", canonical=True)
+    return ciphertext, header
+
+
+def lookups(cache, result):
+    return metrics.CACHE_LOOKUPS.values.get((cache, result), 0)
+
+
+def test_fingerprint_ignores_key_order():
+    assert codebook_fingerprint({"a": "0", "b": "1"}) == codebook_fingerprint({"b": "1", "a": "0"})
+    assert codebook_fingerprint({"a": "0", "b": "1"}) != codebook_fingerprint({"a": "1", "b": "0"})
+    assert codebook_fingerprint(code_lengths={1: "ab"}) == codebook_fingerprint(code_lengths={"1": "ab"})
+
+
+def test_fingerprint_accepts_lone_surrogates():
+    # Регрессия: таблица из кадра (json.loads) с одиночным суррогатом давала 500
+    assert codebook_fingerprint({"\ud800": "0", "a": "1"}) != codebook_fingerprint({"a": "1"})
+
+
+def test_one_entry_for_all_payload_sizes(encoded):
+    ciphertext, header = encoded
+    decoders = [Coding().build_decoder(code_lengths=header["code_lengths"]) for _ in range(3)]
+    for size in (200, 1000, len(ciphertext)):
+        Coding().decompress(ciphertext[:size], "k", 0, None, header["code_lengths"])
+    assert len(decode_cache.items) == 1
+    assert decoders[0].tables is decoders[1].tables is decoders[2].tables
+
+
+def test_short_messages_skip_the_cache(encoded):
+    ciphertext, header = encoded
+    assert Coding().decompress(ciphertext[:16], "k", 0, None, header["code_lengths"])
+    assert len(decode_cache.items) == 0
+
+
+def test_lru_evicts_least_recent():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get_or_create("a", lambda: 0) == 1
+    assert cache.get_or_create("d", lambda: 4) == 4
+
+
+@pytest.mark.skipif(not metrics.ENABLED, reason="метрики отключены")
+def test_lookups_are_counted(encoded):
+    ciphertext, header = encoded
+    hits, misses = lookups("decode_tables", "hit"), lookups("decode_tables", "miss")
+    for _ in range(3):
+        Coding().decompress(ciphertext, "k", header["padding"], None, header["code_lengths"])
+    assert lookups("decode_tables", "miss") == misses + 1
+    assert lookups("decode_tables", "hit") == hits + 2
+
+
+@pytest.mark.skipif(not metrics.ENABLED, reason="метрики отключены")
+def test_pool_lookups_are_returned_with_the_result(encoded):
+    ciphertext, header = encoded
+    text, (stages, pool_lookups) = metrics.collect(
+        Coding().decompress, ciphertext, "k", header["padding"], None, header["code_lengths"])
+    assert text == TEXT
+    assert pool_lookups == [("decode_tables", "miss")]
+    assert "decode" in [name for name, _ in stages]
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from app.huffman import (DecodeTables, TableDecoder, build_code_table, encode_bytes, xor_bytes,
+                         MAX_CODE_LENGTH)
+from app.schemas import Data
+from app.services import Coding, TREE_WALK_BITS
+
+
+def table_entries(symbols):
+    # Число ячеек первичной таблицы и всех вторичных под ней
+    total = len(symbols)
+    for entry in symbols:
+        if isinstance(entry, tuple):
+            total += table_entries(entry[1])
+    return total
+
+
+def tree_decode(codebook, data, padding):
+    # Эталон - побитовый обход дерева из Coding
+    coding = Coding()
+    coding.codebook = codebook
+    bits = ''.join(f'{b:08b}' for b in data)
+    return coding.decode(bits[:len(bits) - padding], coding.build_tree_from_codebook())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_table_decoder_matches_tree_walk(seed):
+    rnd = random.Random(seed)
+    alphabet = [chr(0x400 + i) for i in range(rnd.randint(2, 300))]
+    weights = [rnd.choice([1, 2, 3, 1000, 2 ** rnd.randint(0, 30)]) for _ in alphabet]
+    text = ''.join(rnd.choices(alphabet, weights=weights, k=rnd.randint(1, 3000)))
+    if len(set(text)) < 2:
+        text += alphabet[0] + alphabet[1]
+    response = Coding().compress_and_encrypt(Data(text=text, key="key"))
+    data = xor_bytes(bytes.fromhex(response.encoded_data), b"key")
+
+    expected = tree_decode(response.huffman_codes, data, response.padding)
+    assert expected == text
+    for primary_bits in (1, 5, DecodeTables.PRIMARY_BITS):
+        tables = DecodeTables(build_code_table(response.huffman_codes), primary_bits)
+        assert TableDecoder(tables).decode(data, response.padding) == expected
+
+
+def test_feed_in_chunks():
+    text = "съешь же ещё этих мягких французских булок" * 200
+    coding = Coding()
+    ciphertext, header = coding.compress(text, "k")
+    decoder = Coding().build_decoder(header["huffman_codes"])
+    data = xor_bytes(ciphertext, b"k")
+    parts = [decoder.feed(data[i:i + 7]) for i in range(0, len(data), 7)]
+    assert ''.join(parts) + decoder.finish(header["padding"]) == text
+
+
+def test_long_codes_use_bounded_memory():
+    # Регрессия: таблица на 2^max_length ячеек для 60-битного кода не помещалась в память
+    codebook = {"a": "1", "b": "0" * 60, "c": "0" * 59 + "1"}
+    table = build_code_table(codebook)
+    tables = DecodeTables(table)
+    assert table_entries(tables.symbols) < 2 * (1 << DecodeTables.PRIMARY_BITS)
+
+    data, padding = encode_bytes("abcacb" * 10, table)
+    assert TableDecoder(tables).decode(bytes(data), padding) == "abcacb" * 10
+
+
+def test_fibonacci_frequencies_decode():
+    # Частоты Фибоначчи дают самое глубокое дерево: код длиной в число символов минус один
+    alphabet = [chr(0x41 + i) for i in range(50)]
+    frequency = [1, 1]
+    while len(frequency) < len(alphabet):
+        frequency.append(frequency[-1] + frequency[-2])
+    text = ''.join(symbol * min(count, 3) for symbol, count in zip(alphabet, frequency))
+    coding = Coding()
+    header = coding.prepare_codes(list(zip(alphabet, frequency)))
+    assert max(map(len, header["huffman_codes"].values())) == len(alphabet) - 1
+
+    tables = DecodeTables(coding.code_table)
+    assert table_entries(tables.symbols) < 2 * (1 << DecodeTables.PRIMARY_BITS)
+    data, padding = encode_bytes(text, coding.code_table)
+    assert TableDecoder(tables).decode(bytes(data), padding) == text
+
+
+def test_code_longer_than_limit_is_rejected():
+    with pytest.raises(ValueError):
+        DecodeTables(build_code_table({"a": "1", "b": "0" * (MAX_CODE_LENGTH + 1)}))
+
+
+def test_short_and_table_paths_agree():
+    # Короткие сообщения идут обходом дерева, длинные - по таблицам
+    for size in (5, TREE_WALK_BITS // 8, TREE_WALK_BITS):
+        text = ("абв где" * size)[:size]
+        coding = Coding()
+        ciphertext, header = coding.compress(text, "k", canonical=True)
+        assert Coding().decompress(ciphertext, "k", header["padding"], None, header["code_lengths"]) == text
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from app.frequency import Histogram
+from app.huffman import BitWriter, encode_bytes, build_code_table
+from app.services import Coding
+
+
+def pack_bits(bits):
+    # Эталон: строка из '0' и '1', дополненная нулями до целого байта
+    padding = (8 - len(bits) % 8) % 8
+    bits += '0' * padding
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)), padding
+
+
+def codebook_for(text):
+    coding = Coding()
+    coding.prepare_codes(Histogram().update(text).most_common())
+    return coding
+
+
+@pytest.mark.parametrize("text", ["a", "ab", "привет, мир!", "😀😀x", "abracadabra" * 500])
+def test_encode_bytes_matches_bit_string(text):
+    coding = codebook_for(text)
+    data, padding = coding.encode_bytes(text, coding.code_table)
+    assert (bytes(data), padding) == pack_bits(coding.encode(text))
+
+
+def test_bit_writer_chunks_equal_whole_text():
+    rnd = random.Random(1)
+    text = ''.join(rnd.choice("абвгд abc\n") for _ in range(10000))
+    table = build_code_table(codebook_for(text).codebook)
+    whole = encode_bytes(text, table)
+
+    writer = BitWriter(table)
+    output = bytearray()
+    start = 0
+    while start < len(text):
+        size = rnd.randint(0, 97)
+        output += writer.write(text[start:start + size])
+        start += size
+    tail, padding = writer.flush()
+    assert (bytes(output + tail), padding) == (bytes(whole[0]), whole[1])
+
+
+def test_unknown_symbol_raises():
+    coding = codebook_for("ab")
+    with pytest.raises(KeyError):
+        coding.encode_bytes("abc", coding.code_table)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from app import api
+from app.executor import CodingExecutor, ExecutorBusy, WorkerLost
+
+
+# Задачи пула процессов должны импортироваться по имени, поэтому они на уровне модуля
+def pid(*args):
+    return os.getpid()
+
+
+def pids(items):
+    return [(item, os.getpid()) for item in items]
+
+
+def crash(*args):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def executor():
+    executor = CodingExecutor(process_workers=1, thread_workers=2, small_payload_size=100, max_pending=4)
+    yield executor
+    executor.shutdown()
+
+
+def test_small_jobs_run_in_threads_large_in_processes(executor):
+    assert asyncio.run(executor.run(pid, size=10)) == os.getpid()
+    assert asyncio.run(executor.run(pid, size=1000)) != os.getpid()
+    assert executor.pending == 0
+
+
+def test_map_keeps_order(executor):
+    items = list(range(50))
+    result = asyncio.run(executor.map(pids, items, size=1000))
+    assert [item for item, _ in result] == items
+    assert asyncio.run(executor.map(pids, [], size=1000)) == []
+
+
+def test_full_queue_raises_busy(executor):
+    executor.max_pending = 0
+    with pytest.raises(ExecutorBusy):
+        asyncio.run(executor.run(pid))
+    with pytest.raises(ExecutorBusy):
+        asyncio.run(executor.map(pids, [1]))
+
+
+def test_pool_is_recreated_after_worker_dies(executor):
+    # Регрессия: после гибели процесса сломанный пул отвечал ошибкой на все запросы
+    with pytest.raises(WorkerLost):
+        asyncio.run(executor.run(crash, size=1000))
+    assert asyncio.run(executor.run(pid, size=1000)) != os.getpid()
+
+    with pytest.raises(WorkerLost):
+        asyncio.run(executor.map(crash, [1, 2], size=1000))
+    assert len(asyncio.run(executor.map(pids, [1, 2, 3], size=1000))) == 3
+    assert executor.pending == 0
+
+
+def test_pool_creation_failure_does_not_leak_pending(executor, monkeypatch):
+    def broken_pool(size):
+        raise OSError("fork failed")
+
+    monkeypatch.setattr(executor, "get_pool", broken_pool)
+    for _ in range(executor.max_pending + 1):
+        with pytest.raises(OSError):
+            asyncio.run(executor.run(pid))
+        with pytest.raises(OSError):
+            asyncio.run(executor.map(pids, [1]))
+    assert executor.pending == 0
+
+
+def test_api_busy_is_503(client, monkeypatch):
+    monkeypatch.setattr(api.coding_executor, "max_pending", 0)
+    response = client.post("/encode", json={"text": "hello", "key": "k"})
+    assert response.status_code == 503
+
+
+def test_api_worker_lost_is_503(client, monkeypatch):
+    monkeypatch.setattr(api.coding_executor, "small_payload_size", 0)
+    monkeypatch.setattr(api, "compress_and_encrypt", crash)
+    response = client.post("/encode", json={"text": "hello", "key": "k"})
+    assert response.status_code == 503
+
+    monkeypatch.undo()
+    response = client.post("/encode", json={"text": "hello", "key": "k"})
+    assert response.status_code == 200
@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+import pytest
+
+from app import frequency
+from app.frequency import Histogram, merge_histograms
+
+np = pytest.importorskip("numpy")
+
+rnd = random.Random(16)
+TEXTS = [
+    "съешь же ещё этих мягких французских булок, да выпей чаю" * 100,
+    ''.join(rnd.choices("ab😀😁🙂 \U0001F9FF\U00010348ж", k=10000)),
+    ''.join(rnd.choices([chr(0x10000 + i * 997) for i in range(50)] + list("xyz"), k=5000)),
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_order_matches_counter(text):
+    assert Histogram().update(text).most_common() == Counter(text).most_common()
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_many_chunks(text, monkeypatch):
+    monkeypatch.setattr(frequency, "CHUNK_SIZE", 1000)
+    monkeypatch.setattr(frequency, "SMALL_TEXT", 0)
+    assert Histogram().update(text).most_common() == Counter(text).most_common()
+
+
+def test_chunks_merge_in_text_order():
+    text = TEXTS[1]
+    parts = [Histogram().update(text[start:start + 3000]) for start in range(0, len(text), 3000)]
+    assert merge_histograms(parts).most_common() == Counter(text).most_common()
+
+
+def test_sparse_values_skip_bincount(monkeypatch):
+    # Регрессия: один астральный символ давал bincount на сотни тысяч ячеек
+    sizes = []
+    bincount = np.bincount
+
+    def spy(values, *args, **kwargs):
+        counts = bincount(values, *args, **kwargs)
+        sizes.append(len(counts))
+        return counts
+
+    monkeypatch.setattr(np, "bincount", spy)
+    text = "обычный текст " * 300 + "\U0001F600"
+    assert Histogram().update(text).most_common() == Counter(text).most_common()
+    assert all(size < 4 * len(text) for size in sizes)
+
+
+@pytest.mark.parametrize("with_numpy", [True, False])
+def test_update_bytes(monkeypatch, with_numpy):
+    data = bytes(rnd.choices(range(256), k=5000)) + b"\x00" * 300
+    if not with_numpy:
+        monkeypatch.setattr(frequency, "np", None)
+    monkeypatch.setattr(frequency, "CHUNK_SIZE", 700)
+    expected = Counter(map(chr, data)).most_common()
+    assert Histogram().update_bytes(data).most_common() == expected
+    assert Histogram().update_bytes(memoryview(data)).most_common() == expected
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setattr(frequency, "np", None)
+    assert Histogram().update(TEXTS[1]).most_common() == Counter(TEXTS[1]).most_common()
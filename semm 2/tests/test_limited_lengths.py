@@ -0,0 +1,83 @@
+import itertools
+import random
+from fractions import Fraction
+
+import pytest
+
+from app.frequency import Histogram
+from app.huffman import (CodeLengthError, build_tree, generate_code_lengths, limited_code_lengths,
+                         MAX_CODE_LENGTH)
+from app.schemas import Data
+from app.services import Coding
+
+
+def cost(frequency, lengths):
+    return sum(freq * lengths[symbol] for symbol, freq in frequency)
+
+
+def best_cost(frequency, max_length):
+    # Перебор всех длин, удовлетворяющих неравенству Крафта, - эталон для малых алфавитов
+    best = None
+    for lengths in itertools.product(range(1, max_length + 1), repeat=len(frequency)):
+        if sum(Fraction(1, 2 ** length) for length in lengths) <= 1:
+            total = sum(freq * length for (_, freq), length in zip(frequency, lengths))
+            best = total if best is None else min(best, total)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_package_merge_is_optimal_under_the_bound(seed):
+    rnd = random.Random(seed)
+    count = rnd.randint(2, 6)
+    frequency = [(chr(0x61 + i), rnd.choice([1, 2, 5, 40, 1000])) for i in range(count)]
+    max_length = rnd.randint((count - 1).bit_length(), 4)
+
+    lengths = limited_code_lengths(frequency, max_length)
+    assert max(lengths.values()) <= max_length
+    assert sum(Fraction(1, 2 ** length) for length in lengths.values()) == 1
+    assert cost(frequency, lengths) == best_cost(frequency, max_length)
+
+
+def test_loose_bound_keeps_huffman_cost():
+    frequency = Histogram().update("длины без ограничения совпадают с Хаффманом" * 3).most_common()
+    huffman = generate_code_lengths(build_tree(frequency))
+    limited = limited_code_lengths(frequency, max(huffman.values()))
+    assert cost(frequency, limited) == cost(frequency, huffman)
+
+
+def test_limited_codes_without_extra_bits():
+    # Регрессия: при extra_bits == 0 отдавались коды дерева длиннее ограничения
+    text = "aaaaaabbbbbccddddeeeeffffffggggg"
+    response = Coding().compress_and_encrypt(Data(text=text, key="k", max_code_length=3))
+    assert response.extra_bits == 0
+    assert max(map(len, response.huffman_codes.values())) <= 3
+    assert Coding().decrypt_and_decompress(response) == {"decoded_text": text}
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_limited_round_trip(canonical):
+    text = ''.join(chr(0x400 + i) * (2 ** (i % 18)) for i in range(24))
+    response = Coding().compress_and_encrypt(Data(text=text, key="k", canonical=canonical, max_code_length=6))
+    assert response.extra_bits > 0
+    assert Coding().decrypt_and_decompress(response) == {"decoded_text": text}
+
+
+def test_infeasible_bound():
+    frequency = [(chr(0x61 + i), 1) for i in range(9)]
+    with pytest.raises(CodeLengthError, match="не меньше 4"):
+        limited_code_lengths(frequency, 3)
+
+
+@pytest.mark.parametrize("max_code_length", [0, MAX_CODE_LENGTH + 1])
+def test_api_rejects_out_of_range_limit(client, max_code_length):
+    response = client.post("/encode", json={"text": "abc", "key": "k", "max_code_length": max_code_length})
+    assert response.status_code == 422
+    response = client.post("/encode/binary", params={"max_code_length": max_code_length}, content=b"abc",
+                           headers={"X-Key": "k", "Content-Type": "application/octet-stream"})
+    assert response.status_code == 422
+
+
+def test_api_infeasible_limit_is_400(client):
+    response = client.post("/encode", json={"text": "abcdefgh", "key": "k", "max_code_length": 2})
+    assert response.status_code == 400
+    assert "не меньше 3" in response.json()["detail"]
@@ -0,0 +1,71 @@
+import re
+
+from app import metrics
+
+
+def test_histogram_render_is_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Проверка", ("stage",), (0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, "a")
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP test_seconds Проверка", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="a"} 4' in lines
+
+
+def test_counter_and_gauge():
+    counter = metrics.Counter("test_total", "Проверка", ("result",))
+    counter.inc("hit")
+    counter.inc("hit")
+    assert counter.render() == ["# HELP test_total Проверка", "# TYPE test_total counter", 'test_total{result="hit"} 2']
+    gauge = metrics.Gauge("test_pending", "Проверка", callback=lambda: 7)
+    assert gauge.render()[-1] == "test_pending 7"
+
+
+def stages(name):
+    return metrics.STAGE_SECONDS.series.get((name,), [0, 0])[-1]
+
+
+def test_collect_returns_samples_instead_of_recording():
+    def work():
+        with metrics.stage("test_collect"):
+            metrics.cache_lookup("test_cache", True)
+        return 42
+
+    result, samples = metrics.collect(work)
+    assert result == 42
+    assert stages("test_collect") == 0
+    metrics.record(samples)
+    assert stages("test_collect") == 1
+    assert metrics.CACHE_LOOKUPS.values[("test_cache", "hit")] == 1
+
+
+def test_disabled_stage_is_shared_null_context(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    assert metrics.stage("count") is metrics.stage("tree")
+    with metrics.stage("test_disabled"):
+        pass
+    assert stages("test_disabled") == 0
+
+
+def test_metrics_endpoint(client):
+    client.post("/encode", json={"text": "метрики этапов", "key": "k"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert re.search(r'app_stage_seconds_count\{stage="count"\} [1-9]', text)
+    assert 'http_request_seconds_count{method="POST",path="/encode",status="200"}' in text
+    assert "coding_executor_pending 0" in text
+
+
+def test_unknown_paths_share_a_label(client):
+    client.get("/no/such/path/123")
+    assert 'path="/no/such/path/123"' not in client.get("/metrics").text
+
+
+def test_disabled_endpoint(client, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,86 @@
+import asyncio
+import importlib.util
+import pathlib
+
+import httpx
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+MIGRATION = pathlib.Path(__file__).resolve().parent.parent / "versions" / "8f3b2d6a1c90_add_unique_index_on_users_email.py"
+
+
+@pytest.fixture
+def migration():
+    spec = importlib.util.spec_from_file_location("unique_email_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def users_engine(tmp_path):
+    # Таблица users в состоянии до миграции: без уникального индекса
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/old.bd")
+    with engine.begin() as connection:
+        connection.execute(sa.text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, "
+                                   "password VARCHAR NOT NULL)"))
+    yield engine
+    engine.dispose()
+
+
+def upgrade(engine, migration):
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+
+def test_duplicates_abort_the_migration(users_engine, migration):
+    with users_engine.begin() as connection:
+        connection.execute(sa.text("INSERT INTO users (email, password) VALUES "
+                                   "('a@x', '1'), ('a@x', '2'), ('b@x', '3'), ('c@x', '4'), ('c@x', '5'), ('c@x', '6')"))
+
+    with pytest.raises(RuntimeError) as error:
+        upgrade(users_engine, migration)
+    assert "a@x (записей: 2)" in str(error.value)
+    assert "c@x (записей: 3)" in str(error.value)
+    assert "b@x" not in str(error.value)
+    with users_engine.connect() as connection:
+        # Ни одна запись не удалена, индекс не создан
+        assert connection.execute(sa.text("SELECT COUNT(*) FROM users")).scalar() == 6
+        assert "ix_users_email" not in {index["name"] for index in sa.inspect(connection).get_indexes("users")}
+
+    # После ручной очистки миграция проходит
+    with users_engine.begin() as connection:
+        connection.execute(sa.text("DELETE FROM users WHERE id IN (2, 5, 6)"))
+    upgrade(users_engine, migration)
+    with users_engine.connect() as connection:
+        indexes = {index["name"]: index for index in sa.inspect(connection).get_indexes("users")}
+    assert indexes["ix_users_email"]["unique"]
+
+
+def test_duplicate_sign_up_is_400(client):
+    user = {"email": "twice@migrations.test", "password": "p"}
+    assert client.post("/sign-up/", json=user).status_code == 201
+    response = client.post("/sign-up/", json=user)
+    assert response.status_code == 400
+    assert "уже зарегистрирован" in response.json()["detail"]
+
+
+def test_concurrent_sign_ups_for_one_email(database):
+    from app import cruds
+    from app.api import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                user = {"email": "race@migrations.test", "password": "p"}
+                responses = await asyncio.gather(*[client.post("/sign-up/", json=user) for _ in range(10)])
+                return sorted(response.status_code for response in responses)
+        finally:
+            await cruds.engine.dispose()
+            await cruds.read_engine.dispose()
+
+    assert asyncio.run(run()) == [201] + [400] * 9
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from app import wire
+
+# Алфавит в тысячи символов: таблица кодов не влезла бы в заголовки HTTP
+rnd = random.Random(5)
+BIG_ALPHABET_TEXT = ''.join(chr(rnd.randrange(0x4E00, 0x4E00 + 6000)) for _ in range(100000))
+
+
+@pytest.mark.parametrize("params", [{}, {"canonical": "true"}, {"max_code_length": "14"}])
+def test_stream_round_trip(client, params):
+    response = client.post("/encode/stream", params=params, content=BIG_ALPHABET_TEXT.encode(),
+                           headers={"X-Key": "k"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == wire.MEDIA_TYPE
+    assert sum(len(name) + len(value) for name, value in response.headers.items()) < 1024
+
+    fields, _ = wire.unpack_header(response.content)
+    assert fields["padding"] == int(response.headers["x-padding"])
+
+    decoded = client.post("/decode/stream", content=response.content, headers={"X-Key": "k"})
+    assert decoded.status_code == 200
+    assert decoded.text == BIG_ALPHABET_TEXT
+
+
+def test_stream_needs_key_header(client):
+    assert client.post("/encode/stream", params={"key": "k"}, content=b"hello").status_code == 422
+
+
+@pytest.mark.parametrize("body", [
+    b"junk",
+    wire.HEADER.pack(wire.MAGIC, 0, 0, 3) + b"{x}",
+    wire.HEADER.pack(wire.MAGIC, 0, 0, 2) + b"\xff\xfe",
+    wire.HEADER.pack(wire.MAGIC, 0, 0, 2) + b"[]",
+    wire.HEADER.pack(wire.MAGIC, 0, 0, 100) + b"{}",
+    wire.pack_header(0, model=1),
+])
+def test_bad_preamble_is_client_error(client, body):
+    response = client.post("/decode/stream", content=body, headers={"X-Key": "k"})
+    assert response.status_code == 400
+
+
+def test_invalid_utf8_body_is_client_error(client):
+    response = client.post("/encode/stream", content=b"\xff\xfe", headers={"X-Key": "k"})
+    assert response.status_code == 400
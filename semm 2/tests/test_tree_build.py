@@ -0,0 +1,50 @@
+import random
+import sys
+
+import pytest
+
+from app.Shifrovanie import build_huffman_tree, generate_huffman_codes, huffman_encode, huffman_decode
+from app.huffman import build_tree, generate_codes, generate_code_lengths
+
+
+def reference_cost(frequencies):
+    # Прежний способ: сортировка списка и pop(0) на каждом слиянии
+    nodes = sorted(frequencies)
+    total = 0
+    while len(nodes) > 1:
+        merged = nodes.pop(0) + nodes.pop(0)
+        total += merged
+        nodes.append(merged)
+        nodes.sort()
+    return total
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_heap_tree_has_optimal_cost(seed):
+    rnd = random.Random(seed)
+    alphabet = "абвгдеёжзий klmnop😀"
+    text = ''.join(rnd.choices(alphabet, weights=range(1, len(alphabet) + 1), k=rnd.randint(2, 5000)))
+    if len(set(text)) < 2:
+        text += "аб"
+    codes = generate_huffman_codes(build_huffman_tree(text))
+    frequencies = [text.count(symbol) for symbol in set(text)]
+    assert sum(text.count(symbol) * len(code) for symbol, code in codes.items()) == reference_cost(frequencies)
+
+
+def test_encode_decode_round_trip():
+    text = "Шифрование и сжатие текста методом Хаффмана 😀" * 30
+    encoded, codes = huffman_encode(text)
+    assert set(encoded) <= {"0", "1"}
+    assert huffman_decode(encoded, codes) == text
+
+
+def test_deep_tree_does_not_recurse():
+    # Частоты Фибоначчи дают дерево глубже предела рекурсии
+    count = sys.getrecursionlimit() + 100
+    frequency = [1, 1]
+    while len(frequency) < count:
+        frequency.append(frequency[-1] + frequency[-2])
+    tree = build_tree([(chr(0x4E00 + i), freq) for i, freq in enumerate(frequency)])
+    lengths = generate_code_lengths(tree)
+    assert max(lengths.values()) == count - 1
+    assert {symbol: len(code) for symbol, code in generate_codes(tree).items()} == lengths
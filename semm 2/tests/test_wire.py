@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from app import wire
+
+TEXT = "двоичный кадр вместо hex в JSON " * 50
+
+
+@pytest.mark.parametrize("table", [
+    {"huffman_codes": {"a": "0", "б": "10", "😀": "11"}},
+    {"code_lengths": {"1": "a", "2": "б😀"}},
+    {"model": 7},
+])
+@pytest.mark.parametrize("binary", [False, True])
+def test_frame_round_trip(table, binary):
+    frame = wire.pack_frame(b"\x01\x02\x03", 5, binary=binary, **table)
+    fields = wire.unpack_frame(frame)
+    assert bytes(fields.pop("ciphertext")) == b"\x01\x02\x03"
+    expected = {"padding": 5, "huffman_codes": None, "code_lengths": None, "model": None, "binary": binary}
+    expected.update(table)
+    assert fields == expected
+    assert wire.read_header(io.BytesIO(frame)) == expected
+
+
+@pytest.mark.parametrize("frame", [
+    b"",
+    b"XXXX" + bytes(wire.HEADER.size),
+    wire.pack_frame(b"", 0, huffman_codes={"a": "0"})[:-1],
+])
+def test_broken_frame_raises(frame):
+    with pytest.raises(ValueError):
+        wire.unpack_frame(frame)
+
+
+def test_frame_response_matches_json(client):
+    data = {"text": TEXT, "key": "ключ"}
+    as_json = client.post("/encode", json=data).json()
+    frame = client.post("/encode", json=data, headers={"Accept": wire.MEDIA_TYPE})
+    assert frame.headers["content-type"] == wire.MEDIA_TYPE
+    assert bytes(wire.unpack_frame(frame.content)["ciphertext"]).hex() == as_json["encoded_data"]
+    assert len(frame.content) < len(as_json["encoded_data"])
+    # Ключа в кадре нет
+    assert "ключ".encode() not in frame.content
+
+    decoded = client.post("/decode", content=frame.content,
+                          headers={"Content-Type": wire.MEDIA_TYPE, "X-Key": "ключ".encode()})
+    assert decoded.json() == {"decoded_text": TEXT}
+
+
+def test_frame_decode_needs_key(client):
+    frame = client.post("/encode", json={"text": TEXT, "key": "k"}, headers={"Accept": wire.MEDIA_TYPE})
+    response = client.post("/decode", content=frame.content, headers={"Content-Type": wire.MEDIA_TYPE})
+    assert response.status_code == 400
@@ -0,0 +1,47 @@
+import os
+import random
+
+import pytest
+
+from app import huffman
+from app.huffman import xor_bytes
+from app.services import Coding
+
+
+def naive_xor(data, key_bytes, offset=0):
+    return bytes(byte ^ key_bytes[(offset + i) % len(key_bytes)] for i, byte in enumerate(data))
+
+
+@pytest.mark.parametrize("size", [0, 1, 7, 8, 1000, 65537])
+@pytest.mark.parametrize("key", [b"k", b"key", "ключ".encode(), os.urandom(257)])
+def test_xor_matches_bytewise(size, key):
+    data = os.urandom(size)
+    assert xor_bytes(data, key) == naive_xor(data, key)
+
+
+def test_xor_offset_continues_key():
+    # Куски потока шифруются по отдельности, ключ продолжается с позиции куска
+    data = os.urandom(10000)
+    key = b"secret key"
+    rnd = random.Random(4)
+    parts = []
+    offset = 0
+    while offset < len(data):
+        size = rnd.randint(1, 300)
+        parts.append(xor_bytes(data[offset:offset + size], key, offset))
+        offset += size
+    assert b''.join(parts) == xor_bytes(data, key)
+
+
+def test_xor_without_numpy(monkeypatch):
+    data = os.urandom(3000)
+    expected = xor_bytes(data, b"abc", 5)
+    monkeypatch.setattr(huffman, "np", None)
+    assert xor_bytes(data, b"abc", 5) == expected == naive_xor(data, b"abc", 5)
+
+
+def test_coding_xor_round_trip():
+    coding = Coding()
+    bits = "0110100111110000" * 40
+    encrypted = coding.xor_encrypt(bits, "ключ")
+    assert coding.xor_decrypt(encrypted, "ключ", 0) == bits
@@ -0,0 +1,36 @@
+"""create codebooks table
+
+Revision ID: 5c1e7a9d3b42
+Revises: 207bd18ed39b
+Create Date: 2026-10-18 12:05:37.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d3b42'
+down_revision: Union[str, Sequence[str], None] = '207bd18ed39b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'codebooks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('code_lengths', sa.JSON(), nullable=False),
+        sa.Column('escape_length', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('codebooks')
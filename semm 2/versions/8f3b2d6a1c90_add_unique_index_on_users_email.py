@@ -0,0 +1,42 @@
+"""add unique index on users.email
+
+Revision ID: 8f3b2d6a1c90
+Revises: 5c1e7a9d3b42
+Create Date: 2026-10-18 14:20:11.538204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b2d6a1c90'
+down_revision: Union[str, Sequence[str], None] = '5c1e7a9d3b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубликаты, которые успели появиться из-за гонки в старом sign_up, не дадут
+    # построить уникальный индекс. Удалять чужие аккаунты миграция не должна:
+    # останавливаемся и перечисляем адреса, чтобы их разобрали вручную
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT email, COUNT(*) FROM users GROUP BY email HAVING COUNT(*) > 1 ORDER BY email"
+    )).all()
+    if duplicates:
+        listed = "\n".join(f"  {email} (записей: {count})" for email, count in duplicates[:50])
+        more = f"\n  ... и другие, всего адресов: {len(duplicates)}" if len(duplicates) > 50 else ""
+        raise RuntimeError(
+            f"В users повторяются email (адресов: {len(duplicates)}), уникальный индекс не построить.\n"
+            f"{listed}{more}\n"
+            "Объедините или удалите лишние записи и запустите миграцию снова."
+        )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_email'), table_name='users')
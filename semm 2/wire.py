@@ -0,0 +1,158 @@
+import io
+import json
+import struct
+
+
+# Двоичный формат результата кодирования:
+#   заголовок HEADER (магия, флаги, паддинг, длина таблицы), таблица кодов
+#   в JSON (словарь кодов, длины канонических кодов или id обученной кодовой
+#   книги), затем зашифрованные байты без hex-преобразования. Ключ в кадр
+#   не пишется: его передают отдельно, иначе шифрование ничего не скрывает
+MAGIC = b'HUF1'
+HEADER = struct.Struct('>4sBBI')
+FLAG_CANONICAL = 0x01
+FLAG_MODEL = 0x02
+FLAG_BYTES = 0x04  # байтовый режим: декодированный результат - байты, а не текст UTF-8
+
+MEDIA_TYPE = "application/octet-stream"
+
+# Блочный контейнер: BLOCKS_MAGIC, затем независимые кадры блоков, затем индекс
+# (смещение и длина каждого кадра) и число блоков в конце. Индекс позволяет
+# прочитать блок N, не разбирая предыдущие, и записывать контейнер потоком
+BLOCKS_MAGIC = b'HUFB'
+BLOCK_ENTRY = struct.Struct('>QQ')
+BLOCKS_TRAILER = struct.Struct('>I')
+
+
+def pack_header(padding, huffman_codes=None, code_lengths=None, model=None, binary=False):
+    if model is not None:
+        flags = FLAG_MODEL
+        table = model
+    elif code_lengths is not None:
+        flags = FLAG_CANONICAL
+        table = code_lengths
+    else:
+        flags = 0
+        table = huffman_codes
+    if binary:
+        flags |= FLAG_BYTES
+    table_bytes = json.dumps(table, ensure_ascii=False, separators=(',', ':')).encode()
+    return HEADER.pack(MAGIC, flags, padding, len(table_bytes)) + table_bytes
+
+
+def pack_frame(ciphertext, padding, huffman_codes=None, code_lengths=None, model=None, binary=False):
+    return pack_header(padding, huffman_codes, code_lengths, model, binary) + ciphertext
+
+
+def unpack_header(data):
+    # Возвращает поля заголовка и смещение, с которого начинаются зашифрованные байты
+    if len(data) < HEADER.size:
+        raise ValueError("Слишком короткий кадр.")
+    magic, flags, padding, table_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат кадра.")
+    offset = HEADER.size
+    if len(data) < offset + table_length:
+        raise ValueError("Кадр обрезан.")
+
+    table = json.loads(bytes(data[offset:offset + table_length]))
+    offset += table_length
+    if not isinstance(table, int if flags & FLAG_MODEL else dict):
+        raise ValueError("Неверная таблица кодов в кадре.")
+
+    fields = {"padding": padding, "huffman_codes": None, "code_lengths": None,
+              "model": None, "binary": bool(flags & FLAG_BYTES)}
+    if flags & FLAG_MODEL:
+        fields["model"] = table
+    elif flags & FLAG_CANONICAL:
+        fields["code_lengths"] = table
+    else:
+        fields["huffman_codes"] = table
+    return fields, offset
+
+
+def read_header(file):
+    # Читает заголовок кадра из файла, не трогая зашифрованные байты за ним
+    head = file.read(HEADER.size)
+    if len(head) < HEADER.size:
+        raise ValueError("Слишком короткий кадр.")
+    _, _, _, table_length = HEADER.unpack(head)
+    fields, _ = unpack_header(head + file.read(table_length))
+    return fields
+
+
+def unpack_frame(data):
+    fields, offset = unpack_header(data)
+    fields["ciphertext"] = memoryview(data)[offset:]
+    return fields
+
+
+class BlockWriter:
+    def __init__(self, file):
+        self.file = file
+        self.file.write(BLOCKS_MAGIC)
+        self.offset = len(BLOCKS_MAGIC)
+        self.index = []
+
+    def add(self, frame):
+        self.file.write(frame)
+        self.index.append((self.offset, len(frame)))
+        self.offset += len(frame)
+
+    def close(self):
+        for offset, length in self.index:
+            self.file.write(BLOCK_ENTRY.pack(offset, length))
+        self.file.write(BLOCKS_TRAILER.pack(len(self.index)))
+
+
+def pack_blocks(frames):
+    buffer = io.BytesIO()
+    writer = BlockWriter(buffer)
+    for frame in frames:
+        writer.add(frame)
+    writer.close()
+    return buffer.getvalue()
+
+
+def is_blocks(data):
+    return bytes(data[:len(BLOCKS_MAGIC)]) == BLOCKS_MAGIC
+
+
+def block_index(data):
+    if not is_blocks(data) or len(data) < len(BLOCKS_MAGIC) + BLOCKS_TRAILER.size:
+        raise ValueError("Неизвестный формат блочного контейнера.")
+    count, = BLOCKS_TRAILER.unpack_from(data, len(data) - BLOCKS_TRAILER.size)
+    start = len(data) - BLOCKS_TRAILER.size - count * BLOCK_ENTRY.size
+    if start < len(BLOCKS_MAGIC):
+        raise ValueError("Блочный контейнер обрезан.")
+    return [BLOCK_ENTRY.unpack_from(data, start + i * BLOCK_ENTRY.size) for i in range(count)]
+
+
+def unpack_blocks(data):
+    view = memoryview(data)
+    return [view[offset:offset + length] for offset, length in block_index(data)]
+
+
+def unpack_block(data, number):
+    index = block_index(data)
+    if not 0 <= number < len(index):
+        raise ValueError(f"Блока {number} нет, всего блоков: {len(index)}.")
+    offset, length = index[number]
+    return memoryview(data)[offset:offset + length]
+
+
+def read_block_index(file):
+    # То же для файла: читаются только хвост с индексом
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    if file.read(len(BLOCKS_MAGIC)) != BLOCKS_MAGIC or size < len(BLOCKS_MAGIC) + BLOCKS_TRAILER.size:
+        raise ValueError("Неизвестный формат блочного контейнера.")
+    file.seek(size - BLOCKS_TRAILER.size)
+    count, = BLOCKS_TRAILER.unpack(file.read(BLOCKS_TRAILER.size))
+    start = size - BLOCKS_TRAILER.size - count * BLOCK_ENTRY.size
+    if start < len(BLOCKS_MAGIC):
+        raise ValueError("Блочный контейнер обрезан.")
+    file.seek(start)
+    entries = file.read(count * BLOCK_ENTRY.size)
+    return [BLOCK_ENTRY.unpack_from(entries, i * BLOCK_ENTRY.size) for i in range(count)]